@@ -0,0 +1,116 @@
+import logging
+import os
+import shutil
+import threading
+import time
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STORE_FOLDER = os.environ.get("RESULT_STORE_FOLDER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "resultados"))
+# Tope de tamaño y antigüedad de las cachés en disco; 0 desactiva cada límite
+RESULT_STORE_MAX_MB = int(os.environ.get("RESULT_STORE_MAX_MB", 1024))
+RESULT_STORE_TTL_DIAS = int(os.environ.get("RESULT_STORE_TTL_DIAS", 30))
+# Cada proceso revisa una carpeta a lo más una vez por intervalo, no en cada escritura
+PODA_INTERVALO = int(os.environ.get("CACHE_PODA_INTERVALO", 300))
+
+_ultima_poda = {}
+_poda_lock = threading.Lock()
+
+
+def _tamano(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(raiz, nombre)) for raiz, _, nombres in os.walk(path) for nombre in nombres)
+
+
+def tocar(path):
+    # Marca la entrada como usada: la poda descarta primero las de uso más antiguo
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def podar_carpeta(carpeta, max_mb, ttl_dias, intervalo=PODA_INTERVALO):
+    # Borra las entradas (archivos o subcarpetas) vencidas y, si la carpeta sigue excediendo max_mb,
+    # las de uso más antiguo hasta quedar bajo el tope. Devuelve cuántas borró
+    ahora = time.time()
+    with _poda_lock:
+        if ahora - _ultima_poda.get(carpeta, 0) < intervalo:
+            return 0
+        _ultima_poda[carpeta] = ahora
+    if not os.path.isdir(carpeta):
+        return 0
+
+    entradas = []
+    for nombre in os.listdir(carpeta):
+        path = os.path.join(carpeta, nombre)
+        if nombre.endswith(".tmp"):
+            continue
+        try:
+            entradas.append((os.path.getmtime(path), _tamano(path), path))
+        except OSError:
+            # Otro proceso la borró mientras se recorría la carpeta
+            continue
+
+    total = sum(tamano for _, tamano, _ in entradas)
+    borradas = 0
+    for modificado, tamano, path in sorted(entradas):
+        vencida = ttl_dias and ahora - modificado > ttl_dias * 86400
+        if not vencida and not (max_mb and total > max_mb * 1024 * 1024):
+            break
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= tamano
+        borradas += 1
+    if borradas:
+        logger.info("🗑️ %s entradas descartadas de %s", borradas, carpeta)
+    return borradas
+
+
+def _ruta(digest):
+    return os.path.join(STORE_FOLDER, f"{digest}.pkl")
+
+
+def buscar_resultado(digest):
+    # Devuelve (banco, DataFrame etiquetado) si el PDF con ese SHA-256 ya se procesó
+    path = _ruta(digest)
+    if not os.path.exists(path):
+        return None, None
+    try:
+        resultado = pd.read_pickle(path)
+    except Exception as e:
+        logger.warning("⚠️ Resultado almacenado ilegible para %s: %s", digest, e)
+        return None, None
+    tocar(path)
+    return resultado["banco"], resultado["data"]
+
+
+def guardar_resultado(digest, banco, data):
+    os.makedirs(STORE_FOLDER, exist_ok=True)
+    path = _ruta(digest)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pd.to_pickle({"banco": banco, "data": data}, tmp_path)
+    os.replace(tmp_path, path)
+    podar_carpeta(STORE_FOLDER, RESULT_STORE_MAX_MB, RESULT_STORE_TTL_DIAS)
+
+
+def resultados_disponibles(digests):
+    # La poda puede haber descartado resultados de un trabajo que sigue vigente
+    return all(os.path.exists(_ruta(digest)) for digest in digests)
+
+
+def iterar_resultados(digests):
+    # Carga los DataFrames almacenados de uno en uno, para exportar sin tenerlos todos en memoria.
+    # Un resultado que falta interrumpe la exportación: nunca se entrega un archivo sin alguna de sus hojas
+    for digest in digests:
+        _, data = buscar_resultado(digest)
+        if data is None:
+            raise LookupError(f"El resultado {digest} ya no está en el almacén")
+        yield data
@@ -1,13 +1,25 @@
-from flask import Flask, request, jsonify, send_file, send_from_directory
-import pandas as pd
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory, stream_with_context
+import logging
 import os
-import pdfplumber
+import threading
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from werkzeug.exceptions import NotFound
 from werkzeug.utils import secure_filename
-from extractor import extract_movements, extract_bbva, extract_banamex, extract_banregio, extract_azteca, extract_inbursa, extract_santander, extract_banorte
-from db import insert_data
-from model import predecir_etiqueta
+from trabajos import (EXCEL_FILENAME, nuevo_trabajo_id, reservar_cupo, liberar_cupo, crear_trabajo, obtener_trabajo,
+                      esperar_trabajo, estado_trabajo, trabajo_en_uso, estadisticas_cache_etiquetas)
+from model import precargar_modelo
+from pdf_text import documento_desde_stream
+import metricas
+from exportar import EXTENSIONES, MIMETYPES, comprimir_gzip, escribir_excel, generar_texto
+from almacen import iterar_resultados, resultados_disponibles
+from db import GRUPOS_RESUMEN, consultar_movimientos, consultar_resumen, leer_cursor
 from flask_cors import CORS
 
+# Los mensajes por línea de los extractores son DEBUG; LOG_LEVEL=DEBUG los vuelve a mostrar
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format="%(message)s")
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__, static_folder="build", static_url_path="")
 CORS(app, resources={r"/*": {"origins": "*"}})
 
@@ -15,176 +27,269 @@ CORS(app, resources={r"/*": {"origins": "*"}})
 def serve():
     return send_from_directory(app.static_folder, "index.html")
 
-UPLOAD_FOLDER = "uploads"
+UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads"))
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+app.config["UPLOAD_WORKERS"] = int(os.environ.get("UPLOAD_WORKERS", os.cpu_count() or 1))
+app.config["PAGE_WORKERS"] = int(os.environ.get("PAGE_WORKERS", os.cpu_count() or 1))
+app.config["MODEL_WARMUP"] = os.environ.get("MODEL_WARMUP", "0") == "1"
+# Tope de la petición completa: Flask responde 413 antes de leer el cuerpo si Content-Length lo excede
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_UPLOAD_MB", 100)) * 1024 * 1024
+app.config["MOVIMIENTOS_POR_PAGINA"] = int(os.environ.get("MOVIMIENTOS_POR_PAGINA", 100))
+app.config["MOVIMIENTOS_MAX_PAGINA"] = int(os.environ.get("MOVIMIENTOS_MAX_PAGINA", 1000))
+# Cookie con el último trabajo del cliente: /generate la usa cuando no recibe job_id
+JOB_COOKIE = "job_id"
 
-all_movements = {}
-
-def save_to_file(data_dict, filename, file_type):
-    filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-    print(f"Guardando en formato: {file_type}, archivo: {filepath}")
-
-    for sheet_name, df in data_dict.items():
-        if "fecha_operacion" in df.columns:
-            df["fecha"] = pd.to_datetime(df["fecha_operacion"], errors='coerce').dt.strftime("%d/%m/%Y")
-        if "etiqueta" not in df.columns:
-            print(f"⚠️ Error: La columna 'etiqueta' no existe en la hoja '{sheet_name}'. Se asignará 'Sin etiqueta'.")
-            df["etiqueta"] = "Sin etiqueta"
-        df["retiro"] = df.apply(lambda row: row["monto"] if "retiro" in row["etiqueta"].lower() else 0, axis=1)
-        df["deposito"] = df.apply(lambda row: row["monto"] if "deposito" in row["etiqueta"].lower() else 0, axis=1)
-        df["referencia"] = df["referencia"].fillna("N/A")
-        df["descripcion"] = df["descripcion"].fillna("Sin descripcion")
-        df = df.drop(columns=["fecha_operacion", "monto", "banco", "etiqueta"], errors="ignore")
-
-        columnas = ["fecha", "referencia", "deposito", "retiro", "descripcion"]
-        if file_type == "excel":
-            columnas.append("saldo_operacion")
-        df = df[columnas]
-
-        data_dict[sheet_name] = df
-
-    if file_type == "excel":
-        with pd.ExcelWriter(filepath, engine='xlsxwriter') as writer:
-            for sheet_name, df in data_dict.items():
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-    elif file_type == "csv":
-            df.to_csv(filepath, sep=",", index=False)
-    
-    elif file_type == "txt":
-            df.to_csv(filepath, sep="\t", index=False)
-    
-    else: 
-        print(f"Formato no sportado: {file_type}")
-        return None
-
-    return filepath if os.path.exists(filepath) else None
+# Con MODEL_WARMUP=1 el modelo se carga al arrancar, antes de que se creen los pools de procesos
+if app.config["MODEL_WARMUP"]:
+    precargar_modelo()
 
 @app.route("/upload", methods=["POST"])
 def upload_files():
-    global all_movements
     if "files" not in request.files:
         return jsonify({"error": "No files or file type specified"}), 400
     
     files = request.files.getlist("files")
-    all_movements.clear()
-
-    base_filename = "movimientos_combinados.xlsx"
-    base_filepath = os.path.join(app.config["UPLOAD_FOLDER"], base_filename)
-    if os.path.exists(base_filepath):
-        os.remove(base_filepath)
-        print(f"🗑️ Archivo {base_filename} eliminado para actualizarlo.")
-
-    for file in files:
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-        file.save(filepath)
-        
-        with pdfplumber.open(filepath) as pdf:
-            full_text = "\n".join(page.extract_text() for page in pdf.pages if page.extract_text())
-
-        print(f"📄 Texto extraído del PDF:\n{full_text[:1000]}")
-
-        if "Scotiabank" in full_text:
-            print("🏦 Scotia detectado")
-            bank = "Scotiabank"
-            data = extract_movements(full_text, bank)
-        elif "Banco Santander México" in full_text or "CUENTA SANTANDER PYME" in full_text:
-            print("🏦 Santander detectado")
-            bank = "Santander"
-            data = extract_santander(full_text)
-        elif "Banco Mercantil del Norte" in full_text:
-            print("💳 Banorte detectado")
-            bank = "Banorte"
-            data = extract_banorte(full_text)
-        elif "BANCO INBURSA" in full_text:
-            print("💳 Inbursa")
-            bank = "Inbursa"
-            data = extract_inbursa(full_text)
-        elif "CUENTA DE CHEQUES MONEDA NACIONAL" in full_text or "INVERSION EMPRESARIAL" in full_text:
-            print("🏦 Banamex detectado")
-            bank = "Banamex"
-            data = extract_banamex(full_text)
-        elif "BANCO AZTECA" in full_text:
-            print("🏦 Banco Azteca detectado")
-            bank = "Banco Azteca"
-            data = extract_azteca(full_text)
-        elif "BBVA" in full_text:
-            print("🏦 BBVA detectado")
-            bank = "BBVA"
-            data = extract_bbva(full_text)
-        elif "Banregio" in full_text:
-            print("🏦 Banregio detectado")
-            print("Banregio")
-            bank = "Banregio"
-            data = extract_banregio(full_text)
-
-        else:
-            return jsonify({"error": f"Banco no reconocido en {filename}"}), 400
-        
-        if not data.empty:
-            if "descripcion" not in data.columns or "monto" not in data.columns:
-                print(f"⚠️ Error: No existen las columnas esperadas en data: {data.columns}")
-            else:
-                data["etiqueta"] = data.apply(lambda row: predecir_etiqueta(row["descripcion"], row["monto"]), axis=1)
-            insert_data(data)
-            all_movements[filename.replace(".pdf", "")] = data
-    
-    file_path = save_to_file(all_movements, base_filename, "excel")
 
-    if file_path:
-        return jsonify({
-            "message": "Files processed successfully", 
-            "processed": True,
-            "file_path": file_path.replace("\\", "/")
+    # Sin cupo se rechaza antes de copiar los archivos a memoria: siguen en los temporales de Werkzeug
+    if not reservar_cupo():
+        response = jsonify({"error": "Hay demasiadas cargas en proceso, intenta de nuevo en unos momentos"})
+        response.headers["Retry-After"] = "30"
+        return response, 503
+
+    try:
+        # Cada carga tiene su propia carpeta para que dos cargas simultáneas no se pisen
+        job_id = nuevo_trabajo_id()
+        carpeta = os.path.join(app.config["UPLOAD_FOLDER"], job_id)
+        os.makedirs(carpeta, exist_ok=True)
+
+        # Los PDFs se leen una sola vez desde la petición (hash incluido) y se procesan desde memoria;
+        # los que pasan de PDF_MAX_MEMORIA_MB se copian a la carpeta del trabajo y se procesan desde ahí
+        documentos = []
+        nombres = set()
+        for i, file in enumerate(files):
+            filename = _nombre_unico(secure_filename(file.filename) or f"archivo_{i + 1}.pdf", nombres)
+            documentos.append(documento_desde_stream(filename, file.stream, carpeta))
+
+        # La extracción, el etiquetado y la inserción corren en segundo plano; se consulta con /jobs/<job_id>
+        crear_trabajo(job_id, carpeta, documentos, app.config["UPLOAD_WORKERS"], app.config["PAGE_WORKERS"])
+    except Exception:
+        liberar_cupo()
+        raise
+
+    if request.args.get("async") == "1":
+        response = jsonify({
+            "message": "Files queued for processing",
+            "job_id": job_id,
+            "status_url": f"jobs/{job_id}"
         })
+        response.status_code = 202
+    else:
+        # Contrato anterior (lo usa el bundle compilado en build/): la petición espera a que el trabajo termine
+        response = _respuesta_sincrona(job_id)
+    response.set_cookie(JOB_COOKIE, job_id, httponly=True, samesite="Lax")
+    return response
+
+def _respuesta_sincrona(job_id):
+    trabajo = obtener_trabajo(job_id)
+    esperar_trabajo(trabajo)
+    estado = estado_trabajo(trabajo)
+    if estado["estado"] != "terminado":
+        response = jsonify(dict(estado, processed=False))
+        response.status_code = 422
+        return response
+    return jsonify({
+        "message": "Files processed successfully",
+        "processed": True,
+        "job_id": job_id,
+        "file_path": f"download/{job_id}?file_type=excel"
+    })
+
+def _nombre_unico(filename, nombres):
+    # Dos archivos con el mismo nombre en una carga serían la misma hoja del Excel
+    base, extension = os.path.splitext(filename)
+    candidato, n = filename, 1
+    while candidato in nombres:
+        n += 1
+        candidato = f"{base}_{n}{extension}"
+    nombres.add(candidato)
+    return candidato
+
+@app.errorhandler(413)
+def upload_too_large(error):
+    limite = app.config["MAX_CONTENT_LENGTH"] // (1024 * 1024)
+    return jsonify({"error": f"La carga excede el máximo de {limite} MB"}), 413
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    trabajo = obtener_trabajo(job_id)
+    if trabajo is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+
+    estado = estado_trabajo(trabajo)
+    if estado["estado"] == "terminado":
+        estado["processed"] = True
+        estado["file_path"] = f"download/{job_id}?file_type=excel"
+    return jsonify(estado)
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(metricas.exponer(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/cache/etiquetas", methods=["GET"])
+def label_cache_stats():
+    return jsonify(estadisticas_cache_etiquetas())
+
+def _valor_json(valor):
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+@app.route("/movements", methods=["GET"])
+def list_movements():
+    # Filtros opcionales: banco, etiqueta, desde/hasta (YYYY-MM-DD); cursor es el "siguiente" de la página anterior
+    try:
+        desde = request.args.get("desde")
+        hasta = request.args.get("hasta")
+        cursor = request.args.get("cursor")
+        filtros = {
+            "banco": request.args.get("banco") or None,
+            "etiqueta": request.args.get("etiqueta") or None,
+            "desde": date.fromisoformat(desde).isoformat() if desde else None,
+            "hasta": date.fromisoformat(hasta).isoformat() if hasta else None,
+        }
+        if cursor:
+            leer_cursor(cursor)
+        limite = int(request.args.get("limite", app.config["MOVIMIENTOS_POR_PAGINA"]))
+    except ValueError:
+        return jsonify({"error": "Parámetros inválidos: fechas YYYY-MM-DD, limite entero y cursor de una respuesta anterior"}), 400
+    limite = max(1, min(limite, app.config["MOVIMIENTOS_MAX_PAGINA"]))
+
+    filas, siguiente = consultar_movimientos(despues=cursor or None, limite=limite, **filtros)
+    return jsonify({
+        "movimientos": [{columna: _valor_json(valor) for columna, valor in fila.items()} for fila in filas],
+        "siguiente": siguiente
+    })
+
+def _mes_param(nombre):
+    # Acepta "YYYY-MM" o una fecha completa; devuelve el primer día del mes
+    valor = request.args.get(nombre)
+    if not valor:
+        return None
+    return date.fromisoformat(f"{valor[:7]}-01").isoformat()
+
+@app.route("/summary", methods=["GET"])
+def summary():
+    # Totales de resumen_movimientos; agrupar=mes,banco,etiqueta (cualquier subconjunto) decide el desglose
+    try:
+        desde = _mes_param("desde")
+        hasta = _mes_param("hasta")
+    except ValueError:
+        return jsonify({"error": "desde/hasta deben ser meses YYYY-MM"}), 400
+    agrupar = [columna for columna in request.args.get("agrupar", ",".join(GRUPOS_RESUMEN)).split(",") if columna]
+    if any(columna not in GRUPOS_RESUMEN for columna in agrupar):
+        return jsonify({"error": f"agrupar solo admite: {', '.join(GRUPOS_RESUMEN)}"}), 400
+
+    filas = consultar_resumen(desde, hasta, request.args.get("banco") or None, request.args.get("etiqueta") or None, agrupar)
+    return jsonify({"resumen": [{columna: _valor_json(valor) for columna, valor in fila.items()} for fila in filas]})
 
 @app.route("/generate", methods=["GET"])
 def generate_file():
     file_type = request.args.get("file_type", "excel").lower()
-    print(f"🔥 Generando archivo en formato: {file_type}")
+    job_id = request.args.get("job_id") or request.cookies.get(JOB_COOKIE)
+    logger.info("🔥 Generando archivo en formato: %s", file_type)
+
+    if file_type not in EXTENSIONES:
+        return jsonify({"error": f"Formato no soportado: {file_type}"}), 400
+    error = _error_de_resultado(obtener_trabajo(job_id))
+    if error:
+        return error
+
+    # El archivo se genera al descargarlo, directamente desde los DataFrames del trabajo
+    return jsonify({
+        "message": f"File ready as {file_type.upper()}",
+        "job_id": job_id,
+        "file_path": f"download/{job_id}?file_type={file_type}"
+    })
 
-    base_filename = "movimientos_combinados.xlsx"
-    base_filepath = os.path.join(app.config["UPLOAD_FOLDER"], base_filename)
+def _error_de_resultado(trabajo):
+    if trabajo is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    if trabajo["estado"] != "terminado":
+        return jsonify({"error": f"El trabajo aún no tiene resultados (estado: {trabajo['estado']})"}), 409
+    return None
 
+def _excel_del_trabajo(trabajo):
+    # El Excel de un trabajo terminado no cambia: se genera una vez en su carpeta y las descargas
+    # siguientes (304, rangos) se sirven desde ese archivo
+    if trabajo["excel"]:
+        return trabajo["excel"]
+    filepath = os.path.abspath(os.path.join(trabajo["carpeta"], EXCEL_FILENAME))
+    if not os.path.exists(filepath):
+        tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with metricas.medir("exportacion", formato="excel"):
+            escribir_excel(trabajo["movimientos"], tmp_path)
+        os.replace(tmp_path, filepath)
+    return filepath
+
+@app.route("/download/<job_id>", methods=["GET"])
+def download_result(job_id):
+    file_type = request.args.get("file_type", "excel").lower()
+    if file_type not in EXTENSIONES:
+        return jsonify({"error": f"Formato no soportado: {file_type}"}), 400
+
+    trabajo = obtener_trabajo(job_id)
+    error = _error_de_resultado(trabajo)
+    if error:
+        return error
+
+    download_name = f"movimientos_combinados.{EXTENSIONES[file_type]}"
     if file_type == "excel":
-        if os.path.exists(base_filepath):
-            return jsonify({
-                "message": "File already exists",
-                "file": base_filename,
-                "file_path": base_filepath.replace("\\", "/")
-            })
-        else:
-            return jsonify({"error": "El archivo base no existe"}), 404
-        
-    new_extension = "csv" if file_type == "csv"  else "txt"
-    new_filename = f"movimientos_combinados.{new_extension}"
-    new_filepath = os.path.join(app.config["UPLOAD_FOLDER"], new_filename)
+        # El trabajo no se descarta mientras se genera su Excel y send_file lo abre; después el archivo
+        # abierto sigue siendo legible aunque se borre la carpeta.
+        # send_file resuelve ETag, Last-Modified, If-None-Match (304) y Range (206)
+        with trabajo_en_uso(trabajo) as vigente:
+            if not vigente:
+                return jsonify({"error": "El trabajo ya fue descartado; vuelve a subir los archivos"}), 410
+            return send_file(_excel_del_trabajo(trabajo), mimetype=MIMETYPES[file_type], as_attachment=True,
+                             download_name=download_name, conditional=True)
 
-    try:
-        df = pd.read_excel(base_filepath, sheet_name=None)
-        combined_df = pd.concat(df.values(), ignore_index=True)
-        separator = "," if file_type == "csv" else "\t"
-        combined_df.to_csv(new_filepath, sep=separator, index=False)
-
-        return jsonify({
-            "message": f"File converted to {file_type.upper()}",
-            "file_path": new_filepath.replace("\\", "/")
-        })
-    
-    except Exception as e:
-        return jsonify({"error": f"No se pudo convertir el archivo: {str(e)}"}), 500
+    movimientos = trabajo["movimientos"]
+    # EXPORT_STREAMING: movimientos solo tiene los hashes y los DataFrames se releen del almacén
+    if trabajo["excel"]:
+        if not resultados_disponibles(movimientos.values()):
+            return jsonify({"error": "Los resultados de este trabajo ya no están disponibles; vuelve a subir los archivos"}), 410
+        hojas = iterar_resultados(movimientos.values())
+    else:
+        hojas = movimientos.values()
+    cuerpo = metricas.medir_iterable("exportacion", generar_texto(hojas, file_type), formato=file_type)
 
-@app.route("/uploads/<filename>", methods=["GET"])
-def download_file(filename):
-    
-    base_dir = r"C:\Users\ASUS-5\OneDrive - MALDONADO VILLASEÑOR CONSULTORES\BS - Contabilidad\Aplicaciones\React\Backend"
+    gzip = "gzip" in request.accept_encodings
+    if gzip:
+        cuerpo = comprimir_gzip(cuerpo)
+    response = Response(
+        stream_with_context(cuerpo),
+        mimetype=MIMETYPES[file_type],
+        headers={"Content-Disposition": f"attachment; filename={download_name}"}
+    )
+    if gzip:
+        response.content_encoding = "gzip"
+    response.vary.add("Accept-Encoding")
+    # El resultado de un trabajo terminado no cambia; con un 304 el generador nunca se recorre
+    response.set_etag(f"{job_id}-{file_type}{'-gzip' if gzip else ''}")
+    response.last_modified = datetime.fromtimestamp(trabajo["finalizado"], tz=timezone.utc)
+    return response.make_conditional(request)
 
-    filepath = os.path.join(base_dir, "uploads", filename)
-    if os.path.exists(filepath):
-        return send_file(filepath, as_attachment=True)
-    return jsonify({"error": "File not found"}), 404
+@app.route("/uploads/<path:filename>", methods=["GET"])
+def download_file(filename):
+    # Relativo a UPLOAD_FOLDER: send_from_directory rechaza rutas que salgan de la carpeta
+    # y responde 304 o rangos parciales según los encabezados de la petición
+    try:
+        return send_from_directory(app.config["UPLOAD_FOLDER"], filename, as_attachment=True)
+    except NotFound:
+        return jsonify({"error": "File not found"}), 404
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True, threaded=True)
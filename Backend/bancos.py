@@ -0,0 +1,61 @@
+import logging
+import re
+from functools import partial
+from extractor import extract_movements, extract_bbva, extract_banamex, extract_banregio, extract_azteca, extract_inbursa, extract_santander, extract_banorte
+
+# Páginas con texto que se revisan para detectar el banco (normalmente basta la primera)
+PAGINAS_DETECCION = 2
+
+logger = logging.getLogger(__name__)
+
+BANCOS = []
+_patron = None
+
+
+def _compilar():
+    # Un solo regex con un grupo nombrado por banco: b0, b1, ... en orden de registro
+    global _patron
+    alternativas = [
+        f"(?P<b{i}>{'|'.join(re.escape(marcador) for marcador in banco['marcadores'])})"
+        for i, banco in enumerate(BANCOS)
+    ]
+    _patron = re.compile("|".join(alternativas))
+
+
+def registrar_banco(nombre, marcadores, extractor):
+    # El orden de registro es la prioridad cuando una página contiene marcadores de varios bancos
+    BANCOS.append({"nombre": nombre, "marcadores": list(marcadores), "extractor": extractor})
+    _compilar()
+
+
+def detectar_banco_en_texto(texto):
+    encontrados = {int(match.lastgroup[1:]) for match in _patron.finditer(texto)}
+    if not encontrados:
+        return None
+    return BANCOS[min(encontrados)]
+
+
+def detectar_banco(paginas):
+    # Solo se leen las primeras páginas con texto, nunca el documento completo
+    revisadas = 0
+    for texto in paginas:
+        if not texto:
+            continue
+        banco = detectar_banco_en_texto(texto)
+        if banco is not None:
+            logger.info("🏦 %s detectado", banco["nombre"])
+            return banco
+        revisadas += 1
+        if revisadas >= PAGINAS_DETECCION:
+            break
+    return None
+
+
+registrar_banco("Scotiabank", ["Scotiabank"], partial(extract_movements, bank="Scotiabank"))
+registrar_banco("Santander", ["Banco Santander México", "CUENTA SANTANDER PYME"], extract_santander)
+registrar_banco("Banorte", ["Banco Mercantil del Norte"], extract_banorte)
+registrar_banco("Inbursa", ["BANCO INBURSA"], extract_inbursa)
+registrar_banco("Banamex", ["CUENTA DE CHEQUES MONEDA NACIONAL", "INVERSION EMPRESARIAL"], extract_banamex)
+registrar_banco("Banco Azteca", ["BANCO AZTECA"], extract_azteca)
+registrar_banco("BBVA", ["BBVA"], extract_bbva)
+registrar_banco("Banregio", ["Banregio"], extract_banregio)
@@ -0,0 +1,556 @@
+import argparse
+import contextlib
+import functools
+import glob
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import mysql.connector
+import numpy as np
+import pandas as pd
+import db
+import exportar
+import model
+from bancos import detectar_banco
+from layout import LAYOUTS, extract_layout
+from model import predecir_etiquetas
+from pdf_text import extraer_paginas
+from sinteticos import movimientos_sinteticos
+from tokenizador import MONTO_RE
+
+UPLOADS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
+
+
+
+def conexion_sustituta(args, sqlite_path):
+    # Devuelve una función que abre conexiones a la base de prueba (nunca a la productiva)
+    if args.mysql:
+        config = {**db.DB_CONFIG, "database": args.mysql}
+
+        # El esquema de la base de prueba sale de migraciones/, igual que el productivo: llave primaria
+        # (id, fecha_operacion), índice único con la fecha y particiones mensuales
+        conn = mysql.connector.connect(**config)
+        try:
+            db.aplicar_migraciones(conn)
+        finally:
+            conn.close()
+        return functools.partial(mysql.connector.connect, **config)
+
+    return functools.partial(db.conexion_sqlite, sqlite_path)
+
+
+def _limpiar_tabla(conn):
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM movimientos")
+    cursor.execute("DELETE FROM resumen_movimientos")
+    conn.commit()
+    cursor.close()
+
+
+def _insert_fila_por_fila(data, conn):
+    # Ruta anterior de db.insert_data: un INSERT por fila con iterrows
+    cursor = conn.cursor()
+    hashes = db.hash_movimientos(data)
+    query = db._sql(conn, db.INSERT_MOVIMIENTO)
+    for (_, row), hash_movimiento in zip(data.iterrows(), hashes):
+        cursor.execute(query, (
+            row.get('banco'),
+            row.get('fecha_operacion'),
+            row.get('descripcion', 'Sin descripción'),
+            row.get('referencia', None),
+            float(row.get('monto', 0.0)),
+            float(row.get('saldo_operacion', 0.0)) if row.get('saldo_operacion') is not None else None,
+            row.get('etiqueta', 'Sin etiqueta'),
+            hash_movimiento
+        ))
+    conn.commit()
+    cursor.close()
+
+
+def bench_insert(args):
+    data = movimientos_sinteticos(args.rows)
+    tamano = -(-args.rows // args.statements)
+    estados = [data.iloc[i:i + tamano] for i in range(0, args.rows, tamano)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conectar = conexion_sustituta(args, os.path.join(tmp, "movimientos.db"))
+        conn = conectar()
+        _limpiar_tabla(conn)
+        conn.close()
+
+        # Ruta anterior: una conexión nueva y un INSERT por fila en cada estado de cuenta
+        inicio = time.perf_counter()
+        for estado in estados:
+            conn = conectar()
+            _insert_fila_por_fila(estado, conn)
+            conn.close()
+        anterior = time.perf_counter() - inicio
+
+        conn = conectar()
+        _limpiar_tabla(conn)
+
+        # Ruta nueva: conexión reutilizada y executemany por bloques en una sola transacción
+        inicio = time.perf_counter()
+        for estado in estados:
+            db.insert_data(estado, conn=conn, chunk_size=args.chunk_size)
+        nueva = time.perf_counter() - inicio
+        _limpiar_tabla(conn)
+        conn.close()
+
+    motor = f"MySQL {args.mysql}" if args.mysql else "SQLite"
+    print(f"📊 insert_data ({motor}, {args.rows} filas, {args.statements} estados, bloques de {args.chunk_size})")
+    print(f"   fila por fila: {args.rows / anterior:,.0f} filas/s ({anterior:.2f} s)")
+    print(f"   executemany:   {args.rows / nueva:,.0f} filas/s ({nueva:.2f} s)")
+
+
+def _preparar_hoja_con_apply(df):
+    # Ruta anterior de save_to_file: dos apply por fila que modifican el DataFrame recibido
+    df["fecha"] = pd.to_datetime(df["fecha_operacion"], errors='coerce').dt.strftime("%d/%m/%Y")
+    df["retiro"] = df.apply(lambda row: row["monto"] if "retiro" in row["etiqueta"].lower() else 0, axis=1)
+    df["deposito"] = df.apply(lambda row: row["monto"] if "deposito" in row["etiqueta"].lower() else 0, axis=1)
+    df["referencia"] = df["referencia"].fillna("N/A")
+    df["descripcion"] = df["descripcion"].fillna("Sin descripcion")
+    return df[["fecha", "referencia", "deposito", "retiro", "descripcion", "saldo_operacion"]]
+
+
+def bench_export(args):
+    data = movimientos_sinteticos(args.rows)
+
+    inicio = time.perf_counter()
+    for _ in range(args.repeat):
+        anterior_hoja = _preparar_hoja_con_apply(data.copy())
+    anterior = (time.perf_counter() - inicio) / args.repeat
+
+    inicio = time.perf_counter()
+    for _ in range(args.repeat):
+        hoja = exportar.preparar_hoja(data, incluir_saldo=True)
+    nueva = (time.perf_counter() - inicio) / args.repeat
+
+    iguales = anterior_hoja.reset_index(drop=True).astype(object).equals(hoja.reset_index(drop=True).astype(object))
+    print(f"📊 Preparación de la hoja de exportación ({args.rows} filas, {args.repeat} repeticiones)")
+    print(f"   apply por fila: {anterior * 1000:,.1f} ms")
+    print(f"   vectorizada:    {nueva * 1000:,.1f} ms ({anterior / nueva:,.1f}x)")
+    print(f"   mismo resultado: {'sí' if iguales else 'no'}")
+
+    if args.formato:
+        with tempfile.TemporaryDirectory() as tmp:
+            extension = "xlsx" if args.formato == "excel" else args.formato
+            filepath = os.path.join(tmp, f"movimientos.{extension}")
+            inicio = time.perf_counter()
+            exportar.guardar_archivo({"movimientos": data}, filepath, args.formato)
+            duracion = time.perf_counter() - inicio
+        print(f"   archivo {args.formato} completo: {duracion:.2f} s")
+
+    if args.hojas:
+        _comparar_memoria_excel(data, args.hojas)
+
+
+def _excel_con_pandas(data_dict, destino):
+    # Ruta anterior: pd.ExcelWriter guarda todas las celdas de todas las hojas hasta cerrar el libro
+    with pd.ExcelWriter(destino, engine="xlsxwriter") as writer:
+        for sheet_name, hoja in exportar.preparar_hojas(data_dict, incluir_saldo=True).items():
+            hoja.to_excel(writer, sheet_name=sheet_name, index=False)
+
+
+def _excel_por_hoja(hoja, hojas, destino):
+    # Como trabajos con EXPORT_STREAMING: cada estado de cuenta se escribe y se libera antes del siguiente
+    libro = exportar.abrir_libro(destino)
+    for i in range(hojas):
+        exportar.escribir_hoja(libro, f"estado_{i}", hoja.copy())
+    libro.close()
+
+
+def _comparar_memoria_excel(data, hojas):
+    print(f"📊 Excel de {hojas} hojas de {len(data)} filas (pico de memoria de Python con tracemalloc)")
+    with tempfile.TemporaryDirectory() as tmp:
+        destino = os.path.join(tmp, "movimientos.xlsx")
+        for nombre, funcion in (
+            ("pd.ExcelWriter", lambda: _excel_con_pandas({f"estado_{i}": data.copy() for i in range(hojas)}, destino)),
+            ("constant_memory", lambda: _excel_por_hoja(data, hojas, destino)),
+        ):
+            tracemalloc.start()
+            inicio = time.perf_counter()
+            funcion()
+            duracion = time.perf_counter() - inicio
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"   {nombre:<16} {duracion:6.2f} s | pico {pico / 1024 / 1024:8.1f} MB")
+
+
+SCRIPT_ARRANQUE = """
+import contextlib, io, json, time
+inicio = time.perf_counter()
+import app
+importado = time.perf_counter()
+respuesta = app.app.test_client().get("/jobs/arranque")
+primera_respuesta = time.perf_counter()
+from model import predecir_etiqueta
+with contextlib.redirect_stdout(io.StringIO()):
+    predecir_etiqueta("SPEI RECIBIDO", 100.0)
+primera_prediccion = time.perf_counter()
+print(json.dumps({"import": importado - inicio, "respuesta": primera_respuesta - inicio, "prediccion": primera_prediccion - inicio}))
+"""
+
+
+def bench_startup(args):
+    # Cada medición es un intérprete nuevo, como un worker recién creado
+    print(f"📊 Arranque de app.py ({args.repeat} repeticiones, mediana)")
+    for warmup in ("0", "1"):
+        env = {**os.environ, "MODEL_WARMUP": warmup, "PYTHONWARNINGS": "ignore"}
+        mediciones = []
+        for _ in range(args.repeat):
+            salida = subprocess.run([sys.executable, "-c", SCRIPT_ARRANQUE], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                    env=env, capture_output=True, text=True, check=True)
+            mediciones.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+        medianas = {clave: np.median([m[clave] for m in mediciones]) for clave in mediciones[0]}
+        print(f"   MODEL_WARMUP={warmup}: import {medianas['import']:.2f} s | primera respuesta {medianas['respuesta']:.2f} s | "
+              f"primera predicción {medianas['prediccion']:.2f} s")
+
+
+def estados_de_muestra():
+    # Texto (desde la caché de páginas) y banco detectado de cada PDF de ejemplo en uploads/
+    muestras = []
+    for filepath in sorted(glob.glob(os.path.join(UPLOADS_FOLDER, "*.pdf"))):
+        paginas = extraer_paginas(filepath)
+        with contextlib.redirect_stdout(io.StringIO()):
+            banco = detectar_banco(paginas)
+        if banco is None:
+            print(f"⚠️ Banco no reconocido en {os.path.basename(filepath)}, se omite")
+            continue
+        muestras.append((os.path.basename(filepath), banco, "\n".join(texto for texto in paginas if texto)))
+    return muestras
+
+
+def bench_lineas(args):
+    print(f"📊 Extractores sobre los PDFs de ejemplo ({args.repeat} repeticiones, sin contar los print)")
+    for filename, banco, texto in estados_de_muestra():
+        lineas = texto.count("\n") + 1
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            for _ in range(args.repeat):
+                data = banco["extractor"](texto)
+            duracion = (time.perf_counter() - inicio) / args.repeat
+        print(f"   {banco['nombre']:<13} {filename:<28} {lineas:>6} líneas {len(data):>5} movimientos {lineas / duracion:>12,.0f} líneas/s")
+
+
+def _coincidencias(texto, layout):
+    # Movimientos con el mismo monto en la misma posición, sobre el total del motor de texto
+    if texto.empty or layout.empty:
+        return 0.0
+    filas = min(len(texto), len(layout))
+    iguales = (texto["monto"].iloc[:filas].round(2).to_numpy() == layout["monto"].iloc[:filas].round(2).to_numpy()).sum()
+    return iguales / len(texto)
+
+
+def bench_layout(args):
+    # Ambos motores desde el PDF, sin caché de texto, para comparar el costo completo
+    print(f"📊 Motor de texto vs. motor por coordenadas ({args.repeat} repeticiones)")
+    for filepath in sorted(glob.glob(os.path.join(UPLOADS_FOLDER, "*.pdf"))):
+        filename = os.path.basename(filepath)
+        with contextlib.redirect_stdout(io.StringIO()):
+            banco = detectar_banco(extraer_paginas(filepath))
+        if banco is None or banco["nombre"] not in LAYOUTS:
+            continue
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            for _ in range(args.repeat):
+                paginas = extraer_paginas(filepath, usar_cache=False)
+                texto = banco["extractor"]("\n".join(t for t in paginas if t))
+            duracion_texto = (time.perf_counter() - inicio) / args.repeat
+
+            inicio = time.perf_counter()
+            for _ in range(args.repeat):
+                layout = extract_layout(filepath, banco["nombre"])
+            duracion_layout = (time.perf_counter() - inicio) / args.repeat
+
+        print(f"   {banco['nombre']:<13} {filename:<28} texto: {len(texto):>4} mov. {duracion_texto:.2f} s | "
+              f"layout: {len(layout):>4} mov. {duracion_layout:.2f} s | montos iguales {_coincidencias(texto, layout):.0%}")
+
+
+CONSULTAS_MOVIMIENTOS = [
+    ("banco", {"banco": "Banorte"}),
+    ("banco + mes", {"banco": "Banorte", "desde": "2024-03-01", "hasta": "2024-03-31"}),
+    ("etiqueta", {"etiqueta": "Retiro"}),
+    ("banco + etiqueta + trimestre", {"banco": "Santander", "etiqueta": "Deposito", "desde": "2024-04-01", "hasta": "2024-06-30"}),
+]
+
+
+def _indices_de_migracion():
+    # Los mismos índices de cobertura que crea la migración (la partición es exclusiva de MySQL)
+    sentencias = db.sentencias_migracion("003_indices_particiones.sql")
+    return [s[s.index("CREATE INDEX"):] for s in sentencias if "CREATE INDEX" in s]
+
+
+def _indices_existentes(cursor, mysql):
+    # En MySQL la tabla persiste entre corridas (o ya tiene la migración aplicada); la base SQLite es nueva
+    if not mysql:
+        return set()
+    cursor.execute("SELECT DISTINCT index_name FROM information_schema.statistics "
+                   "WHERE table_schema = DATABASE() AND table_name = 'movimientos'")
+    return {nombre for (nombre,) in cursor.fetchall()}
+
+
+def _recorrer_paginas(conn, filtros, limite, paginas):
+    # Tiempo de la primera página y de la última alcanzada siguiendo el cursor
+    tiempos = []
+    filas_totales = 0
+    siguiente = None
+    for _ in range(paginas):
+        inicio = time.perf_counter()
+        filas, siguiente = db.consultar_movimientos(despues=siguiente, limite=limite, conn=conn, **filtros)
+        tiempos.append(time.perf_counter() - inicio)
+        filas_totales += len(filas)
+        if siguiente is None:
+            break
+    return tiempos, filas_totales, siguiente
+
+
+def bench_movements(args):
+    data = movimientos_sinteticos(args.rows)
+    print(f"📊 /movements sobre {args.rows} movimientos ({'MySQL ' + args.mysql if args.mysql else 'SQLite'}), "
+          f"páginas de {args.limite}, hasta {args.paginas} páginas")
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = conexion_sustituta(args, os.path.join(tmp, "movimientos.db"))()
+        _limpiar_tabla(conn)
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.insert_data(data, conn=conn)
+
+        for con_indices in (False, True):
+            cursor = conn.cursor()
+            existentes = _indices_existentes(cursor, args.mysql)
+            for sentencia in _indices_de_migracion():
+                # CREATE INDEX <nombre> ON ...
+                indice = sentencia.split()[2]
+                if not con_indices and indice in existentes:
+                    # La base MySQL ya tiene la migración 003: la primera medición es sin sus índices
+                    cursor.execute(f"DROP INDEX {indice} ON movimientos")
+                elif con_indices and indice not in existentes:
+                    cursor.execute(sentencia)
+            cursor.execute("ANALYZE" if not args.mysql else "ANALYZE TABLE movimientos")
+            if args.mysql:
+                cursor.fetchall()
+            conn.commit()
+            cursor.close()
+            print(f"   {'con' if con_indices else 'sin'} índices de la migración 003:")
+            for nombre, filtros in CONSULTAS_MOVIMIENTOS:
+                tiempos, filas, _ = _recorrer_paginas(conn, filtros, args.limite, args.paginas)
+                print(f"      {nombre:<30} primera {tiempos[0] * 1000:7.2f} ms | página {len(tiempos)} "
+                      f"{tiempos[-1] * 1000:7.2f} ms | {filas} filas")
+
+        # El recorrido completo por cursor entrega cada fila que cumple el filtro una sola vez y en orden
+        nombre, filtros = CONSULTAS_MOVIMIENTOS[1]
+        _, filas, _ = _recorrer_paginas(conn, filtros, args.limite, args.rows)
+        esperadas = ((data["banco"] == filtros["banco"]) & (data["fecha_operacion"] >= filtros["desde"])
+                     & (data["fecha_operacion"] <= filtros["hasta"])).sum()
+        print(f"   recorrido completo ({nombre}): {filas} de {esperadas} filas esperadas")
+        _limpiar_tabla(conn)
+        conn.close()
+
+
+HISTORIAL_BENCHMARK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "historial.json")
+UMBRAL_REGRESION = 0.8
+
+
+def _medir(funcion):
+    # Dos corridas: una para el tiempo y otra con tracemalloc para el pico de memoria de Python
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+
+        tracemalloc.start()
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return resultado, duracion, pico
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _texto_escalado(banco, texto, escala):
+    # Repetir el texto completo no agrega filas en los extractores que solo leen la primera sección
+    # (Inbursa, BBVA); ahí se repiten en su lugar las líneas con montos. Se usa la variante que más filas extrae
+    completo = "\n".join([texto] * escala)
+    lineas = []
+    for linea in texto.split("\n"):
+        lineas.extend([linea] * (escala if MONTO_RE.search(linea) else 1))
+    por_linea = "\n".join(lineas)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return max((completo, por_linea), key=lambda variante: len(banco["extractor"](variante)))
+
+
+def _filas_variadas(base, escala):
+    # Cada copia con descripción y monto distintos: si no, la caché de etiquetas y el hash de movimiento
+    # colapsan las repeticiones y las etapas siguientes miden búsquedas en lugar de filas nuevas
+    copias = [base]
+    for copia in range(1, escala):
+        copias.append(base.assign(descripcion=base["descripcion"].astype(str) + f" #{copia}",
+                                  monto=base["monto"] + copia / 100))
+    return pd.concat(copias, ignore_index=True)
+
+
+def _etapas_de_muestra(filepath, banco, texto, escala, conectar, carpeta):
+    # Cada etapa del pipeline sobre un estado de cuenta, con el texto y las filas multiplicados por la escala.
+    # Los rendimientos se calculan con las filas que realmente se extrajeron o procesaron
+    etapas = []
+
+    def registrar(etapa, unidades, unidad, duracion, pico):
+        etapas.append({
+            "etapa": etapa, "unidades": unidades, "unidad": unidad, "segundos": duracion,
+            "por_segundo": unidades / duracion if duracion else None, "pico_mb": pico / 1024 / 1024
+        })
+
+    if escala == 1:
+        paginas, duracion, pico = _medir(lambda: extraer_paginas(filepath, usar_cache=False))
+        registrar("texto", len(paginas), "páginas", duracion, pico)
+
+    texto_escalado = _texto_escalado(banco, texto, escala) if escala > 1 else texto
+    data, duracion, pico = _medir(lambda: banco["extractor"](texto_escalado))
+    registrar(f"extractor:{banco['nombre']}", len(data), "filas", duracion, pico)
+
+    # Las etapas siguientes usan las filas de 1x en copias variadas: exactamente escala veces las filas base
+    if escala > 1:
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = _filas_variadas(banco["extractor"](texto), escala)
+    if data.empty:
+        return etapas
+
+    def etiquetar():
+        model._cache.clear()
+        return predecir_etiquetas(data["descripcion"], data["monto"])
+
+    etiquetas, duracion, pico = _medir(etiquetar)
+    data = data.assign(etiqueta=etiquetas)
+    registrar("etiquetado", len(data), "filas", duracion, pico)
+
+    _, duracion, pico = _medir(lambda: exportar.guardar_archivo({"movimientos": data}, os.path.join(carpeta, "movimientos.xlsx"), "excel"))
+    registrar("exportacion", len(data), "filas", duracion, pico)
+
+    conn = conectar()
+
+    def insertar():
+        _limpiar_tabla(conn)
+        return db.insert_data(data, conn=conn)
+
+    _, duracion, pico = _medir(insertar)
+    registrar("insercion", len(data), "filas", duracion, pico)
+    _limpiar_tabla(conn)
+    conn.close()
+    return etapas
+
+
+def _regresiones(corrida, historial):
+    # Compara el rendimiento contra la corrida anterior con la misma llave (archivo, escala, etapa)
+    if not historial:
+        return []
+    # La unidad es parte de la llave: corridas con otra unidad (p. ej. líneas/s) no son comparables
+    anterior = {(r["archivo"], r["escala"], r["etapa"], r["unidad"]): r["por_segundo"] for r in historial[-1]["resultados"]}
+    avisos = []
+    for r in corrida:
+        previo = anterior.get((r["archivo"], r["escala"], r["etapa"], r["unidad"]))
+        if previo and r["por_segundo"] and r["por_segundo"] < previo * UMBRAL_REGRESION:
+            avisos.append(f"{r['archivo']} {r['escala']}x {r['etapa']}: {r['por_segundo']:,.0f} vs {previo:,.0f} {r['unidad']}/s")
+    return avisos
+
+
+def bench_suite(args):
+    resultados = []
+    # La carga perezosa del modelo no debe contarse como etiquetado de la primera muestra
+    model.precargar_modelo()
+    with tempfile.TemporaryDirectory() as tmp:
+        conectar = conexion_sustituta(args, os.path.join(tmp, "movimientos.db"))
+        for filename, banco, texto in estados_de_muestra():
+            filepath = os.path.join(UPLOADS_FOLDER, filename)
+            for escala in args.escalas:
+                for etapa in _etapas_de_muestra(filepath, banco, texto, escala, conectar, tmp):
+                    resultados.append({"archivo": filename, "banco": banco["nombre"], "escala": escala, **etapa})
+                    print(f"   {filename:<28} {escala:>4}x {etapa['etapa']:<24} {etapa['por_segundo'] or 0:>12,.0f} {etapa['unidad']}/s "
+                          f"{etapa['segundos']:>8.3f} s  pico {etapa['pico_mb']:>7.1f} MB")
+
+    historial = []
+    if os.path.exists(args.historial):
+        with open(args.historial, encoding="utf-8") as f:
+            historial = json.load(f)
+
+    avisos = _regresiones(resultados, historial)
+    for aviso in avisos:
+        print(f"⚠️ Regresión: {aviso}")
+
+    historial.append({
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "escalas": args.escalas,
+        "resultados": resultados
+    })
+    os.makedirs(os.path.dirname(os.path.abspath(args.historial)), exist_ok=True)
+    with open(args.historial, "w", encoding="utf-8") as f:
+        json.dump(historial, f, indent=2, ensure_ascii=False)
+    print(f"✅ Resultados agregados a {args.historial}")
+
+    if avisos and args.fallar_en_regresion:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del backend de Exportar-PDF")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    insert_parser = subparsers.add_parser("insert", help="Compara db.insert_data contra la inserción fila por fila")
+    insert_parser.add_argument("--rows", type=int, default=20000)
+    insert_parser.add_argument("--statements", type=int, default=20)
+    insert_parser.add_argument("--chunk-size", type=int, default=db.INSERT_CHUNK_SIZE)
+    insert_parser.add_argument("--mysql", metavar="DATABASE", help="Base MySQL de pruebas a usar en lugar de SQLite; se le aplican las migraciones y se vacía su tabla movimientos")
+    insert_parser.set_defaults(func=bench_insert)
+
+    lineas_parser = subparsers.add_parser("lineas", help="Líneas por segundo de cada extractor sobre los PDFs de uploads/")
+    lineas_parser.add_argument("--repeat", type=int, default=20)
+    lineas_parser.set_defaults(func=bench_lineas)
+
+    export_parser = subparsers.add_parser("export", help="Compara la preparación vectorizada de la exportación contra la ruta con apply")
+    export_parser.add_argument("--rows", type=int, default=100000)
+    export_parser.add_argument("--repeat", type=int, default=3)
+    export_parser.add_argument("--formato", choices=["excel", "csv", "txt"], help="Medir además la escritura del archivo completo")
+    export_parser.add_argument("--hojas", type=int, default=0, help="Comparar la memoria del Excel con tantas hojas contra la escritura por hoja")
+    export_parser.set_defaults(func=bench_export)
+
+    startup_parser = subparsers.add_parser("startup", help="Tiempo desde el import de app.py hasta la primera respuesta y la primera predicción")
+    startup_parser.add_argument("--repeat", type=int, default=3)
+    startup_parser.set_defaults(func=bench_startup)
+
+    layout_parser = subparsers.add_parser("layout", help="Compara el motor de texto contra el motor por coordenadas de layout.py")
+    layout_parser.add_argument("--repeat", type=int, default=1)
+    layout_parser.set_defaults(func=bench_layout)
+
+    movements_parser = subparsers.add_parser("movements", help="Consultas paginadas de /movements con y sin los índices de la migración 003")
+    movements_parser.add_argument("--rows", type=int, default=200000)
+    movements_parser.add_argument("--limite", type=int, default=100)
+    movements_parser.add_argument("--paginas", type=int, default=50)
+    movements_parser.add_argument("--mysql", metavar="DATABASE", help="Base MySQL de pruebas a usar en lugar de SQLite; se le aplican las migraciones y se vacía su tabla movimientos")
+    movements_parser.set_defaults(func=bench_movements)
+
+    suite_parser = subparsers.add_parser("suite", help="Todas las etapas sobre los PDFs de uploads/ a 1x/10x/100x, con historial JSON")
+    suite_parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10, 100])
+    suite_parser.add_argument("--historial", default=HISTORIAL_BENCHMARK)
+    suite_parser.add_argument("--mysql", metavar="DATABASE", help="Base MySQL de pruebas a usar en lugar de SQLite; se le aplican las migraciones y se vacía su tabla movimientos")
+    suite_parser.add_argument("--fallar-en-regresion", action="store_true",
+                              help=f"Salir con código 1 si alguna etapa baja de {UMBRAL_REGRESION:.0%} del rendimiento anterior")
+    suite_parser.set_defaults(func=bench_suite)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
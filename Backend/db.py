@@ -1,33 +1,503 @@
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date
 import mysql.connector
+from mysql.connector import pooling
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MIGRACIONES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migraciones")
+
+DB_CONFIG = {
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "user": os.environ.get("DB_USER", "root"),
+    "password": os.environ.get("DB_PASSWORD", "Ro868686"),
+    "database": os.environ.get("DB_NAME", "movimientos_centralizados")
+}
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+INSERT_CHUNK_SIZE = int(os.environ.get("INSERT_CHUNK_SIZE", 1000))
+
+COLUMNAS_MOVIMIENTO = ["banco", "fecha_operacion", "descripcion", "referencia", "monto", "saldo_operacion", "etiqueta", "hash_movimiento"]
+
+INSERT_MOVIMIENTO = '''
+INSERT IGNORE INTO movimientos 
+(banco, fecha_operacion, descripcion, referencia, monto, saldo_operacion, etiqueta, hash_movimiento)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+'''
+
+# Paginación por llave (fecha_operacion, id). La subconsulta se resuelve con los índices de cobertura de
+# la migración 003 y solo las filas de la página se leen completas.
+CONSULTA_MOVIMIENTOS = '''
+SELECT m.id, m.banco, m.fecha_operacion, m.descripcion, m.referencia, m.monto, m.saldo_operacion, m.etiqueta
+FROM movimientos m
+JOIN (
+    SELECT id, fecha_operacion FROM movimientos
+    WHERE {condiciones}
+    ORDER BY fecha_operacion, id
+    LIMIT %s
+) pagina ON m.id = pagina.id AND m.fecha_operacion = pagina.fecha_operacion
+ORDER BY m.fecha_operacion, m.id
+'''
+MESES_PARTICIONES = int(os.environ.get("MESES_PARTICIONES", 12))
+
+# Resumen por mes, banco y etiqueta (migración 004). Un monto cuenta como depósito o retiro según su
+# etiqueta, con la misma regla que exportar.preparar_hoja.
+COLUMNAS_RESUMEN = ["mes", "banco", "etiqueta", "depositos", "retiros", "total", "movimientos"]
+GRUPOS_RESUMEN = ["mes", "banco", "etiqueta"]
+SUMAR_RESUMEN = {
+    "mysql": '''
+INSERT INTO resumen_movimientos (mes, banco, etiqueta, depositos, retiros, total, movimientos)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE depositos = depositos + VALUES(depositos), retiros = retiros + VALUES(retiros),
+    total = total + VALUES(total), movimientos = movimientos + VALUES(movimientos)
+''',
+    "sqlite": '''
+INSERT INTO resumen_movimientos (mes, banco, etiqueta, depositos, retiros, total, movimientos)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+ON CONFLICT (mes, banco, etiqueta) DO UPDATE SET depositos = depositos + excluded.depositos,
+    retiros = retiros + excluded.retiros, total = total + excluded.total, movimientos = movimientos + excluded.movimientos
+''',
+}
+RECALCULAR_RESUMEN = {
+    "mysql": '''
+INSERT INTO resumen_movimientos (mes, banco, etiqueta, depositos, retiros, total, movimientos)
+SELECT fecha_operacion - INTERVAL (DAYOFMONTH(fecha_operacion) - 1) DAY, COALESCE(banco, ''), COALESCE(etiqueta, ''),
+    SUM(CASE WHEN LOCATE('deposito', LOWER(etiqueta)) > 0 THEN monto ELSE 0 END),
+    SUM(CASE WHEN LOCATE('retiro', LOWER(etiqueta)) > 0 THEN monto ELSE 0 END),
+    SUM(monto), COUNT(*)
+FROM movimientos
+WHERE fecha_operacion IS NOT NULL AND {condiciones}
+GROUP BY 1, 2, 3
+''',
+    "sqlite": '''
+INSERT INTO resumen_movimientos (mes, banco, etiqueta, depositos, retiros, total, movimientos)
+SELECT date(fecha_operacion, 'start of month'), COALESCE(banco, ''), COALESCE(etiqueta, ''),
+    SUM(CASE WHEN INSTR(LOWER(etiqueta), 'deposito') > 0 THEN monto ELSE 0 END),
+    SUM(CASE WHEN INSTR(LOWER(etiqueta), 'retiro') > 0 THEN monto ELSE 0 END),
+    SUM(monto), COUNT(*)
+FROM movimientos
+WHERE fecha_operacion IS NOT NULL AND {condiciones}
+GROUP BY 1, 2, 3
+''',
+}
+
+# Sustituto local de movimientos para pruebas y benchmarks: mismas columnas que las migraciones 001 y 002
+SQLITE_MOVIMIENTOS = '''
+CREATE TABLE IF NOT EXISTS movimientos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    banco TEXT,
+    fecha_operacion TEXT,
+    descripcion TEXT,
+    referencia TEXT,
+    monto REAL,
+    saldo_operacion REAL,
+    etiqueta TEXT,
+    hash_movimiento TEXT UNIQUE
+)
+'''
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = pooling.MySQLConnectionPool(pool_name="movimientos", pool_size=DB_POOL_SIZE, **DB_CONFIG)
+        return _pool
 
 def connect_db():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="Ro868686",
-        database="movimientos_centralizados"
-    )
+    # close() sobre una conexión del pool la devuelve al pool en lugar de cerrarla
+    try:
+        return _get_pool().get_connection()
+    except mysql.connector.errors.PoolError:
+        logger.warning("⚠️ Pool de conexiones agotado, se abre una conexión directa.")
+        return mysql.connector.connect(**DB_CONFIG)
+
+def _dialecto(conn):
+    return "sqlite" if isinstance(conn, sqlite3.Connection) else "mysql"
 
-def insert_data(data):
+def _sql(conn, query):
+    # Permite usar SQLite como sustituto local de MySQL (benchmarks y pruebas)
+    if _dialecto(conn) == "sqlite":
+        return query.replace("%s", "?").replace("INSERT IGNORE", "INSERT OR IGNORE")
+    return query
+
+def sentencias_migracion(nombre):
+    with open(os.path.join(MIGRACIONES_FOLDER, nombre), encoding="utf-8") as f:
+        return [s.strip() for s in f.read().split(";") if s.strip()]
+
+def crear_resumen(conn):
+    # La tabla de resumen de la migración 004 es compatible con MySQL y SQLite tal cual
+    cursor = conn.cursor()
+    for sentencia in sentencias_migracion("004_resumen_movimientos.sql"):
+        cursor.execute(sentencia)
+    cursor.close()
+
+def conexion_sqlite(path=":memory:"):
+    # Base SQLite con movimientos y resumen_movimientos; _sql traduce las consultas de este módulo
+    conn = sqlite3.connect(path)
+    conn.execute(SQLITE_MOVIMIENTOS)
+    crear_resumen(conn)
+    return conn
+
+def _texto(valor):
+    if valor is None or pd.isna(valor):
+        return ""
+    if isinstance(valor, float):
+        return f"{valor:.2f}"
+    if isinstance(valor, date):
+        # Igual que cuando la fecha llegaba como texto "YYYY-MM-DD": las huellas ya guardadas siguen coincidiendo
+        return valor.strftime("%Y-%m-%d")
+    return str(valor).strip()
+
+def _claves_movimientos(data):
+    columnas = ["banco", "fecha_operacion", "descripcion", "referencia", "monto", "saldo_operacion"]
+    return data.reindex(columns=columnas).astype(object).apply(lambda col: col.map(_texto)).agg("|".join, axis=1)
+
+def _huella(clave, ocurrencia):
+    return hashlib.sha256(f"{clave}|{ocurrencia}".encode("utf-8")).hexdigest()
+
+def hash_movimientos(data):
+    # La huella incluye el número de ocurrencia dentro del estado de cuenta para
+    # conservar movimientos idénticos legítimos (dos cargos iguales el mismo día)
+    claves = _claves_movimientos(data)
+    ocurrencia = claves.groupby(claves).cumcount()
+    return [_huella(clave, n) for clave, n in zip(claves, ocurrencia)]
+
+def _a_python(serie):
+    return serie.astype(object).where(serie.notna(), None).tolist()
+
+def filas_movimientos(data):
+    # Convierte el DataFrame completo en tuplas listas para executemany
+    datos = data.reindex(columns=COLUMNAS_MOVIMIENTO[:-1])
+    if pd.api.types.is_datetime64_any_dtype(datos["fecha_operacion"]):
+        datos["fecha_operacion"] = datos["fecha_operacion"].dt.strftime("%Y-%m-%d")
+    datos["descripcion"] = datos["descripcion"].fillna("Sin descripción")
+    datos["monto"] = pd.to_numeric(datos["monto"], errors="coerce").fillna(0.0).astype(float)
+    datos["saldo_operacion"] = pd.to_numeric(datos["saldo_operacion"], errors="coerce")
+    datos["etiqueta"] = datos["etiqueta"].astype(object).fillna("Sin etiqueta")
+    datos["hash_movimiento"] = hash_movimientos(data)
+    return list(zip(*(_a_python(datos[col]) for col in COLUMNAS_MOVIMIENTO)))
+
+def _hashes_existentes(cursor, conn, hashes, chunk_size):
+    existentes = set()
+    for inicio in range(0, len(hashes), chunk_size):
+        bloque = hashes[inicio:inicio + chunk_size]
+        marcadores = ", ".join(["%s"] * len(bloque))
+        cursor.execute(_sql(conn, f"SELECT hash_movimiento FROM movimientos WHERE hash_movimiento IN ({marcadores})"), bloque)
+        existentes.update(h for (h,) in cursor.fetchall())
+    return existentes
+
+def resumen_de_filas(filas):
+    # Totales por grupo de las filas de movimientos (tuplas de filas_movimientos), listos para SUMAR_RESUMEN
+    datos = pd.DataFrame(filas, columns=COLUMNAS_MOVIMIENTO)
+    fechas = pd.to_datetime(datos["fecha_operacion"], errors="coerce", format="mixed")
+    datos = datos[fechas.notna()]
+    etiquetas = datos["etiqueta"].fillna("").astype(str)
+    monto = datos["monto"].astype(float)
+    grupos = pd.DataFrame({
+        "mes": fechas[fechas.notna()].dt.strftime("%Y-%m-01"),
+        "banco": datos["banco"].fillna("").astype(str),
+        "etiqueta": etiquetas,
+        "depositos": monto.where(etiquetas.str.lower().str.contains("deposito", regex=False), 0.0),
+        "retiros": monto.where(etiquetas.str.lower().str.contains("retiro", regex=False), 0.0),
+        "total": monto,
+        "movimientos": 1,
+    }).groupby(GRUPOS_RESUMEN, sort=False, as_index=False).sum()
+    return [
+        (mes, banco, etiqueta, round(depositos, 2), round(retiros, 2), round(total, 2), int(movimientos))
+        for mes, banco, etiqueta, depositos, retiros, total, movimientos in grupos[COLUMNAS_RESUMEN].itertuples(index=False)
+    ]
+
+def _recalcular_grupos(cursor, conn, grupos):
+    # Vuelve a sumar desde movimientos solo los grupos indicados (mes, banco, etiqueta)
+    for mes, banco, etiqueta in grupos:
+        cursor.execute(_sql(conn, "DELETE FROM resumen_movimientos WHERE mes = %s AND banco = %s AND etiqueta = %s"),
+                       (mes, banco, etiqueta))
+        siguiente = (pd.Timestamp(mes) + pd.offsets.MonthBegin(1)).strftime("%Y-%m-%d")
+        condiciones = ("COALESCE(banco, '') = %s AND COALESCE(etiqueta, '') = %s "
+                       "AND fecha_operacion >= %s AND fecha_operacion < %s")
+        cursor.execute(_sql(conn, RECALCULAR_RESUMEN[_dialecto(conn)].format(condiciones=condiciones)),
+                       (banco, etiqueta, mes, siguiente))
+
+def insert_data(data, conn=None, chunk_size=None):
     if data.empty:
-        print("⚠️ No hay datos para insertar.")
-        return
-    conn = connect_db()
+        logger.warning("⚠️ No hay datos para insertar.")
+        return 0
+
+    chunk_size = chunk_size or INSERT_CHUNK_SIZE
+    filas = filas_movimientos(data)
+    propia = conn is None
+    conn = conn or connect_db()
     cursor = conn.cursor()
-    for _, row in data.iterrows():
+    insertados = 0
+    try:
+        # Todos los bloques y el resumen van en una sola transacción
+        existentes = _hashes_existentes(cursor, conn, [fila[-1] for fila in filas], chunk_size)
+        nuevas = [fila for fila in filas if fila[-1] not in existentes]
+        query = _sql(conn, INSERT_MOVIMIENTO)
+        for inicio in range(0, len(nuevas), chunk_size):
+            cursor.executemany(query, nuevas[inicio:inicio + chunk_size])
+            insertados += max(cursor.rowcount, 0)
+
+        resumen = resumen_de_filas(nuevas)
+        if insertados == len(nuevas):
+            if resumen:
+                cursor.executemany(_sql(conn, SUMAR_RESUMEN[_dialecto(conn)]), resumen)
+        else:
+            # Otra carga insertó algunas de estas filas entre la consulta y el INSERT IGNORE:
+            # no se sabe cuáles, así que esos grupos se recalculan desde la tabla
+            _recalcular_grupos(cursor, conn, [fila[:3] for fila in resumen])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if propia:
+            conn.close()
+
+    logger.info("✅ Datos insertados correctamente en la base de datos centralizada (%s nuevos, %s repetidos).", insertados, len(filas) - insertados)
+    return insertados
+
+def calcular_hashes(conn=None, chunk_size=None):
+    # Backfill de la migración 002: las filas cargadas antes tienen hash_movimiento NULL y una nueva carga
+    # del mismo estado de cuenta las volvería a insertar. Toda la tabla se trata como un solo estado de cuenta:
+    # las filas idénticas se numeran en orden de id, igual que hash_movimientos dentro de una carga.
+    # Una huella que ya existe (la fila se volvió a cargar después de la migración) deja la fila en NULL
+    chunk_size = chunk_size or INSERT_CHUNK_SIZE
+    propia = conn is None
+    conn = conn or connect_db()
+    cursor = conn.cursor()
+    consulta = _sql(conn, "SELECT id, banco, fecha_operacion, descripcion, referencia, monto, saldo_operacion "
+                          "FROM movimientos WHERE hash_movimiento IS NULL AND id > %s ORDER BY id LIMIT %s")
+    actualizar = _sql(conn, "UPDATE movimientos SET hash_movimiento = %s WHERE id = %s")
+    ocurrencias = {}
+    ultimo_id = 0
+    calculados = repetidos = 0
+    try:
+        while True:
+            cursor.execute(consulta, (ultimo_id, chunk_size))
+            filas = cursor.fetchall()
+            if not filas:
+                break
+            datos = pd.DataFrame(filas, columns=[col[0] for col in cursor.description])
+            ultimo_id = int(datos["id"].iloc[-1])
+            # filas_movimientos guarda "Sin descripción" en lugar de una descripción vacía; la huella usa la original
+            datos["descripcion"] = datos["descripcion"].where(datos["descripcion"] != "Sin descripción", None)
+
+            hashes = []
+            for clave in _claves_movimientos(datos):
+                n = ocurrencias.get(clave, 0)
+                ocurrencias[clave] = n + 1
+                hashes.append(_huella(clave, n))
+            existentes = _hashes_existentes(cursor, conn, hashes, chunk_size)
+            nuevas = [(h, int(id_movimiento)) for h, id_movimiento in zip(hashes, datos["id"]) if h not in existentes]
+            cursor.executemany(actualizar, nuevas)
+            conn.commit()
+            calculados += len(nuevas)
+            repetidos += len(hashes) - len(nuevas)
+            if len(filas) < chunk_size:
+                break
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if propia:
+            conn.close()
+
+    logger.info("✅ Huellas calculadas: %s (%s filas repetidas quedan sin huella)", calculados, repetidos)
+    return calculados
+
+def reconstruir_resumen(conn=None):
+    # Backfill: vacía resumen_movimientos y la vuelve a calcular desde movimientos en una transacción
+    propia = conn is None
+    conn = conn or connect_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM resumen_movimientos")
+        cursor.execute(RECALCULAR_RESUMEN[_dialecto(conn)].format(condiciones="1 = 1"))
+        cursor.execute("SELECT COUNT(*) FROM resumen_movimientos")
+        (grupos,) = cursor.fetchone()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if propia:
+            conn.close()
+
+    logger.info("✅ Resumen reconstruido: %s grupos", grupos)
+    return grupos
+
+def consultar_resumen(desde=None, hasta=None, banco=None, etiqueta=None, agrupar=GRUPOS_RESUMEN, conn=None):
+    # desde/hasta son meses "YYYY-MM-01"; agrupar elige qué columnas de GRUPOS_RESUMEN separan los totales
+    columnas = [columna for columna in GRUPOS_RESUMEN if columna in agrupar]
+    condiciones = []
+    parametros = []
+    for condicion, valor in (("mes >= %s", desde), ("mes <= %s", hasta), ("banco = %s", banco), ("etiqueta = %s", etiqueta)):
+        if valor is not None:
+            condiciones.append(condicion)
+            parametros.append(valor)
+
+    query = (
+        f"SELECT {', '.join(columnas + [f'SUM({c}) AS {c}' for c in COLUMNAS_RESUMEN[3:-1]])}, "
+        "CAST(SUM(movimientos) AS SIGNED) AS movimientos "
+        f"FROM resumen_movimientos WHERE {' AND '.join(condiciones) or '1 = 1'}"
+    )
+    if columnas:
+        query += f" GROUP BY {', '.join(columnas)} ORDER BY {', '.join(columnas)}"
+
+    propia = conn is None
+    conn = conn or connect_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_sql(conn, query), parametros)
+        nombres = [col[0] for col in cursor.description]
+        return [dict(zip(nombres, fila)) for fila in cursor.fetchall()]
+    finally:
+        cursor.close()
+        if propia:
+            conn.close()
+
+def aplicar_migraciones(conn=None):
+    # Solo MySQL; conn permite aplicarlas a otra base (la de pruebas de benchmark.py)
+    propia = conn is None
+    conn = conn or connect_db()
+    cursor = conn.cursor()
+    try:
         cursor.execute('''
-        INSERT INTO movimientos 
-        (banco, fecha_operacion, descripcion, referencia, monto, saldo_operacion, etiqueta)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        ''', (
-            row.get('banco'), 
-            row.get('fecha_operacion'), 
-            row.get('descripcion', 'Sin descripción'),
-            row.get('referencia', None), 
-            float(row.get('monto', 0.0)), 
-            float(row.get('saldo_operacion', 0.0)) if row.get('saldo_operacion') is not None else None, 
-            row.get('etiqueta', 'Sin etiqueta')
-        ))
-    conn.commit()
-    conn.close()
-    print(f"✅ Datos insertados correctamente en la base de datos centralizada.")
+        CREATE TABLE IF NOT EXISTS migraciones (
+            nombre VARCHAR(255) PRIMARY KEY,
+            aplicada TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        cursor.execute("SELECT nombre FROM migraciones")
+        aplicadas = {nombre for (nombre,) in cursor.fetchall()}
+
+        for nombre in sorted(os.listdir(MIGRACIONES_FOLDER)):
+            if not nombre.endswith(".sql") or nombre in aplicadas:
+                continue
+            for sentencia in sentencias_migracion(nombre):
+                cursor.execute(sentencia)
+            cursor.execute("INSERT INTO migraciones (nombre) VALUES (%s)", (nombre,))
+            conn.commit()
+            logger.info("✅ Migración aplicada: %s", nombre)
+    finally:
+        cursor.close()
+        if propia:
+            conn.close()
+
+def cursor_movimiento(fecha, id_movimiento):
+    # Token opaco para el cliente: fecha e id de la última fila entregada
+    return f"{str(fecha)[:10]}_{id_movimiento}"
+
+def leer_cursor(cursor):
+    # ValueError si el token no tiene la forma fecha_id
+    fecha, id_movimiento = cursor.rsplit("_", 1)
+    return date.fromisoformat(fecha).isoformat(), int(id_movimiento)
+
+def consultar_movimientos(banco=None, etiqueta=None, desde=None, hasta=None, despues=None, limite=100, conn=None):
+    # Devuelve (filas como dicts, cursor de la página siguiente o None)
+    condiciones = []
+    parametros = []
+    for condicion, valor in (("banco = %s", banco), ("etiqueta = %s", etiqueta),
+                             ("fecha_operacion >= %s", desde), ("fecha_operacion <= %s", hasta)):
+        if valor is not None:
+            condiciones.append(condicion)
+            parametros.append(valor)
+    if despues is not None:
+        fecha, id_movimiento = leer_cursor(despues)
+        # Forma expandida en lugar de (fecha_operacion, id) > (%s, %s): MySQL solo usa un constructor de fila
+        # como rango cuando cubre el prefijo del índice, y con banco/etiqueta el índice empieza por esas columnas.
+        # Así el rango sobre fecha_operacion aplica con cualquier filtro
+        condiciones.append("fecha_operacion >= %s AND (fecha_operacion > %s OR id > %s)")
+        parametros.extend([fecha, fecha, id_movimiento])
+
+    # Una fila de más para saber si hay otra página sin hacer un COUNT
+    query = CONSULTA_MOVIMIENTOS.format(condiciones=" AND ".join(condiciones) or "1 = 1")
+    parametros.append(limite + 1)
+
+    propia = conn is None
+    conn = conn or connect_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_sql(conn, query), parametros)
+        columnas = [col[0] for col in cursor.description]
+        filas = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+    finally:
+        cursor.close()
+        if propia:
+            conn.close()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = cursor_movimiento(filas[-1]["fecha_operacion"], filas[-1]["id"])
+    return filas, siguiente
+
+def _mes_siguiente(anio, mes):
+    return (anio, mes + 1) if mes < 12 else (anio + 1, 1)
+
+def asegurar_particiones(meses=MESES_PARTICIONES, conn=None):
+    # Agrega particiones mensuales hasta "meses" después del mes actual, partiendo pmax
+    propia = conn is None
+    conn = conn or connect_db()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT PARTITION_NAME FROM INFORMATION_SCHEMA.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'movimientos' AND PARTITION_NAME IS NOT NULL"
+        )
+        existentes = {nombre for (nombre,) in cursor.fetchall()}
+        if "pmax" not in existentes:
+            logger.warning("⚠️ La tabla movimientos no está particionada; aplica primero las migraciones.")
+            return []
+
+        # Se parte del mes siguiente a la última partición mensual, sin huecos
+        ultima = max(nombre for nombre in existentes if nombre != "pmax")
+        anio, mes = _mes_siguiente(int(ultima[1:5]), int(ultima[6:8]))
+        hoy = date.today()
+        limite = (hoy.year * 12 + hoy.month - 1) + meses
+        nuevas = []
+        while anio * 12 + mes - 1 <= limite:
+            sig_anio, sig_mes = _mes_siguiente(anio, mes)
+            nuevas.append(f"PARTITION p{anio}_{mes:02d} VALUES LESS THAN ('{sig_anio}-{sig_mes:02d}-01')")
+            anio, mes = sig_anio, sig_mes
+
+        if nuevas:
+            cursor.execute(
+                "ALTER TABLE movimientos REORGANIZE PARTITION pmax INTO "
+                f"({', '.join(nuevas)}, PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+            )
+            logger.info("✅ %s particiones mensuales agregadas", len(nuevas))
+        return nuevas
+    finally:
+        cursor.close()
+        if propia:
+            conn.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format="%(message)s")
+    parser = argparse.ArgumentParser(description="Mantenimiento de la base de movimientos")
+    parser.add_argument("accion", nargs="?", choices=["migraciones", "particiones", "resumen", "hashes"], default="migraciones",
+                        help="resumen: reconstruir resumen_movimientos desde movimientos; "
+                             "hashes: calcular hash_movimiento de las filas cargadas antes de la migración 002")
+    parser.add_argument("--meses", type=int, default=MESES_PARTICIONES, help="particiones: meses a cubrir después del actual")
+    args = parser.parse_args()
+    if args.accion == "particiones":
+        asegurar_particiones(args.meses)
+    elif args.accion == "resumen":
+        reconstruir_resumen()
+    elif args.accion == "hashes":
+        calcular_hashes()
+    else:
+        aplicar_migraciones()
@@ -1,31 +1,126 @@
+import argparse
+import os
 import mysql.connector
 import pandas as pd
-import os
+from db import DB_CONFIG, _sql
+
+CSV_FOLDER = "CSV"
+CHUNK_SIZE = 10000
+
+
+def leer_ultimo_id(marca_path):
+    if not os.path.exists(marca_path):
+        return 0
+    with open(marca_path) as f:
+        return int(f.read().strip() or 0)
+
+
+def guardar_ultimo_id(marca_path, ultimo_id):
+    tmp_path = f"{marca_path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(ultimo_id))
+    os.replace(tmp_path, marca_path)
+
+
+def paginar_movimientos(conn, desde_id=0, chunk_size=CHUNK_SIZE):
+    # Paginación por llave (id > último visto): cada página cuesta lo mismo sin importar el tamaño de la tabla
+    cursor = conn.cursor()
+    query = _sql(conn, "SELECT * FROM movimientos WHERE id > %s ORDER BY id LIMIT %s")
+    ultimo_id = desde_id
+    try:
+        while True:
+            cursor.execute(query, (ultimo_id, chunk_size))
+            filas = cursor.fetchall()
+            if not filas:
+                break
+            columnas = [col[0] for col in cursor.description]
+            pagina = pd.DataFrame(filas, columns=columnas)
+            ultimo_id = int(pagina["id"].iloc[-1])
+            yield pagina
+            if len(filas) < chunk_size:
+                break
+    finally:
+        cursor.close()
+
+
+def _tipos_parquet(pagina):
+    # Tipos fijos para que todas las páginas compartan el mismo esquema Parquet
+    pagina = pagina.copy()
+    for col in pagina.columns:
+        if col in ("monto", "saldo_operacion"):
+            pagina[col] = pd.to_numeric(pagina[col], errors="coerce").astype("float64")
+        elif col == "fecha_operacion":
+            pagina[col] = pd.to_datetime(pagina[col], errors="coerce")
+        elif pagina[col].dtype == object:
+            pagina[col] = pagina[col].astype("string")
+    return pagina
+
+
+def exportar_movimientos(conn, csv_filename, parquet_filename=None, incremental=False, chunk_size=CHUNK_SIZE):
+    marca_path = f"{csv_filename}.ultimo_id"
+    desde_id = leer_ultimo_id(marca_path) if incremental else 0
+    escribir_encabezado = not (incremental and os.path.exists(csv_filename))
+    modo = "a" if incremental else "w"
+
+    if parquet_filename:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+    parquet_writer = None
+    total = 0
+    ultimo_id = desde_id
+    try:
+        for pagina in paginar_movimientos(conn, desde_id, chunk_size):
+            pagina.to_csv(csv_filename, mode=modo, header=escribir_encabezado, index=False)
+            modo = "a"
+            escribir_encabezado = False
+
+            if parquet_filename:
+                tabla = pa.Table.from_pandas(_tipos_parquet(pagina), preserve_index=False)
+                if parquet_writer is None:
+                    parquet_writer = pq.ParquetWriter(parquet_filename, tabla.schema)
+                parquet_writer.write_table(tabla.cast(parquet_writer.schema))
+
+            total += len(pagina)
+            ultimo_id = int(pagina["id"].iloc[-1])
+            # La marca avanza con cada página ya escrita: si la exportación se interrumpe,
+            # la siguiente corrida --incremental no vuelve a agregar esas filas al CSV
+            guardar_ultimo_id(marca_path, ultimo_id)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+    return total, ultimo_id
 
-# Configuración de la conexión a MySQL
-db_config = {
-    "host": "localhost",
-    "user": "root",
-    "password": "Ro868686",
-    "database": "movimientos_centralizados" #CAMBIAR LA BASE DE DATOS
-}
 
-# Conectar a la base de datos
-conn = mysql.connector.connect(**db_config)
+def main():
+    parser = argparse.ArgumentParser(description="Exporta la tabla movimientos a CSV (y opcionalmente Parquet) por bloques")
+    parser.add_argument("--salida", default="movimientos_centralizados.csv", help="Nombre del archivo CSV dentro de la carpeta CSV")
+    parser.add_argument("--parquet", action="store_true", help="Escribir también un archivo Parquet (requiere pyarrow)")
+    parser.add_argument("--incremental", action="store_true", help="Solo exportar los movimientos con id mayor al último exportado")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
 
-# Cargar datos de la tabla `movimientos`
-query = "SELECT * FROM movimientos" #CAMBIAR LA TABLA
-data = pd.read_sql(query, conn)
+    os.makedirs(CSV_FOLDER, exist_ok=True)
+    csv_filename = os.path.join(CSV_FOLDER, args.salida)
 
-# Cerrar la conexión
-conn.close()
+    parquet_filename = None
+    if args.parquet:
+        base = os.path.splitext(csv_filename)[0]
+        # Parquet no admite agregar filas: cada exportación incremental genera su propia parte
+        parquet_filename = f"{base}_desde_{leer_ultimo_id(f'{csv_filename}.ultimo_id')}.parquet" if args.incremental else f"{base}.parquet"
 
-csv_folder = "CSV"
-os.makedirs(csv_folder, exist_ok=True)
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        total, ultimo_id = exportar_movimientos(conn, csv_filename, parquet_filename, args.incremental, args.chunk_size)
+    finally:
+        conn.close()
 
-# Guardar los datos en un archivo CSV
-csv_filename = os.path.join(csv_folder, "movimientos_centralizados_02_25_2.csv") #CAMBIAR EL NOMBRE DEL ARCHIVO
+    if total:
+        print(f"✅ {total} movimientos descargados y guardados en {csv_filename} (último id: {ultimo_id})")
+    else:
+        print("✅ No hay movimientos nuevos para exportar")
 
-data.to_csv(csv_filename, index=False)
 
-print(f"✅ Datos descargados y guardados en {csv_filename}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import logging
+import zlib
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES = {"excel": "xlsx", "csv": "csv", "txt": "txt"}
+MIMETYPES = {
+    "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "txt": "text/plain",
+}
+SEPARADORES = {"csv": ",", "txt": "\t"}
+FILAS_POR_BLOQUE = 5000
+# Mismo estilo de encabezado que pandas.to_excel
+FORMATO_ENCABEZADO = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+
+def _contiene_por_categoria(etiquetas, texto):
+    # Se evalúa una vez por etiqueta distinta, no una vez por fila; las etiquetas nulas no cuentan
+    categorias = etiquetas.cat.categories.str.lower().str.contains(texto, regex=False)
+    return np.append(np.asarray(categorias, dtype=bool), False)[etiquetas.cat.codes.to_numpy()]
+
+
+def preparar_hoja(df, incluir_saldo=False):
+    # Devuelve un DataFrame nuevo con las columnas de exportación; df no se modifica
+    if "etiqueta" in df.columns:
+        etiquetas = df["etiqueta"].astype("category")
+    else:
+        logger.warning("⚠️ Error: La columna 'etiqueta' no existe en la hoja. Se asignará 'Sin etiqueta'.")
+        etiquetas = pd.Series("Sin etiqueta", index=df.index, dtype="category")
+
+    monto = df["monto"].to_numpy()
+    hoja = pd.DataFrame({
+        "fecha": pd.to_datetime(df["fecha_operacion"], errors="coerce").dt.strftime("%d/%m/%Y"),
+        "referencia": df["referencia"].fillna("N/A"),
+        "deposito": np.where(_contiene_por_categoria(etiquetas, "deposito"), monto, 0),
+        "retiro": np.where(_contiene_por_categoria(etiquetas, "retiro"), monto, 0),
+        "descripcion": df["descripcion"].fillna("Sin descripcion"),
+    }, index=df.index)
+
+    if incluir_saldo:
+        hoja["saldo_operacion"] = df["saldo_operacion"]
+    return hoja
+
+
+def preparar_hojas(data_dict, incluir_saldo=False):
+    return {sheet_name: preparar_hoja(df, incluir_saldo) for sheet_name, df in data_dict.items()}
+
+
+def abrir_libro(destino):
+    # constant_memory: cada fila se escribe a un archivo temporal de la hoja en cuanto se agrega,
+    # así el libro no guarda todas las celdas en memoria hasta cerrarse
+    return xlsxwriter.Workbook(destino, {"constant_memory": True})
+
+
+def escribir_hoja(libro, sheet_name, df, filas_por_bloque=FILAS_POR_BLOQUE):
+    # Agrega una hoja completa; en modo constant_memory las filas deben ir en orden y la hoja no se puede retomar
+    hoja = preparar_hoja(df, incluir_saldo=True)
+    worksheet = libro.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, list(hoja.columns), libro.add_format(FORMATO_ENCABEZADO))
+    fila = 1
+    for inicio in range(0, len(hoja), filas_por_bloque):
+        bloque = hoja.iloc[inicio:inicio + filas_por_bloque].astype(object)
+        # Celdas vacías en lugar de NaN, como pandas.to_excel
+        for valores in bloque.where(bloque.notna(), None).itertuples(index=False):
+            worksheet.write_row(fila, 0, valores)
+            fila += 1
+
+
+def escribir_excel(data_dict, destino):
+    # destino puede ser una ruta o un buffer en memoria (io.BytesIO)
+    libro = abrir_libro(destino)
+    try:
+        for sheet_name, df in data_dict.items():
+            escribir_hoja(libro, sheet_name, df)
+    finally:
+        libro.close()
+
+
+def generar_texto(hojas, file_type, filas_por_bloque=FILAS_POR_BLOQUE):
+    # CSV/TXT por bloques de filas, sin armar el archivo completo en memoria.
+    # hojas es cualquier iterable de DataFrames; puede cargarlos uno por uno.
+    # Mismas columnas que el Excel, saldo_operacion incluido
+    separator = SEPARADORES[file_type]
+    encabezado = True
+    for df in hojas:
+        hoja = preparar_hoja(df, incluir_saldo=True)
+        for inicio in range(0, len(hoja), filas_por_bloque):
+            yield hoja.iloc[inicio:inicio + filas_por_bloque].to_csv(sep=separator, index=False, header=encabezado)
+            encabezado = False
+
+
+def comprimir_gzip(bloques, nivel=6):
+    # Comprime en streaming los bloques de generar_texto: cada bloque sale comprimido sin esperar al archivo completo
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloque in bloques:
+        datos = compresor.compress(bloque.encode("utf-8"))
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+
+def guardar_archivo(data_dict, filepath, file_type):
+    if file_type == "excel":
+        escribir_excel(data_dict, filepath)
+
+    elif file_type in SEPARADORES:
+        with open(filepath, "w", encoding="utf-8", newline="") as f:
+            for bloque in generar_texto(data_dict.values(), file_type):
+                f.write(bloque)
+
+    else:
+        logger.warning("⚠️ Formato no soportado: %s", file_type)
+        return None
+
+    return filepath
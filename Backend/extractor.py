@@ -1,33 +1,66 @@
+import logging
 import pandas as pd
 import re
-from datetime import datetime
-from model import predecir_etiqueta
-
-def format_date(date_str):
-    try:
-        month_map = {
-            "ENE": "Jan", "FEB": "Feb", "MAR": "Mar", "ABR": "Apr",
-            "MAY": "May", "JUN": "Jun", "JUL": "Jul", "AGO": "Aug",
-            "SEP": "Sep", "OCT": "Oct", "NOV": "Nov", "DIC": "Dec"
-        }
-        
-        if "/" in date_str:
-            day, month = date_str.split("/")  # Formato BBVA "05/FEB"
-        else:
-            parts = date_str.split()
-            if len(parts) < 2:
-                raise ValueError("Formato de fecha incorrecto")
-            day, month = parts  # Formato Scotiabank "05 FEB"
-        
-        month = month.upper()
-        if month not in month_map:
-            raise ValueError(f"Mes desconocido: {month}")
-        
-        formatted_date = f"{day} {month_map[month]} 2024"
-        return datetime.strptime(formatted_date, "%d %b %Y").strftime("%Y-%m-%d")
-    except ValueError as e:
-        print(f"⚠️ Error al convertir fecha: {date_str} - {e}")
-        return "2024-01-01"
+from tokenizador import MESES, MONTO_PESOS, patron_linea, tokenizar, quitar_coincidencias, montos_en_tokens, a_numero
+
+LINEA_SCOTIA = patron_linea(rf'\b\d{{2}}[ /](?:{MESES})\b', monto=MONTO_PESOS)
+FECHA_BBVA_RE = re.compile(r'\d{2}/\w{3}')
+BBVA_ABONOS = ("abono", "depósito", "traspaso", "recibidos")
+FECHA_BANAMEX = rf'\b\d{{2}} \b(?:{MESES})\b'
+FECHA_BANAMEX_RE = re.compile(FECHA_BANAMEX, re.IGNORECASE)
+LINEA_BANAMEX = patron_linea(FECHA_BANAMEX, re.IGNORECASE)
+DIA_RE = re.compile(r'\b\d{1,2}\b')
+FECHA_ISO_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+FECHA_INBURSA_RE = re.compile(rf'\b\b(?:{MESES})\s+\d{{2}}\b', re.IGNORECASE)
+LINEA_SANTANDER = patron_linea(r'\d{2}-[A-Za-z]{3}-\d{4}')
+FECHA_BANORTE_RE = re.compile(r'\d{2}-[A-Z]{3}-\d{2}')
+BANAMEX_PROBLEMATICO_RE = re.compile(r"000180\.B07CHDA\d{3}\.OD\.\d{4}\.\d{2}")
+
+MESES_NUMERO = {mes: i for i, mes in enumerate(MESES.split("|"), start=1)}
+# Los estados de cuenta no traen el año junto a cada movimiento
+ANIO = 2024
+FECHA_POR_DEFECTO = pd.Timestamp(ANIO, 1, 1)
+
+# Mensajes por línea en DEBUG: con LOG_LEVEL=INFO no se formatean
+logger = logging.getLogger(__name__)
+
+def format_dates(textos):
+    # Vectorizado para "05/FEB" (BBVA) y "05 FEB"; lo que no se pueda convertir queda en FECHA_POR_DEFECTO
+    partes = pd.Series(textos, dtype=object).astype(str).str.upper().str.split(r"/|\s+", regex=True)
+    validas = partes.str.len() == 2
+    dias = partes.str[0]
+    dias = pd.to_numeric(dias.where(dias.str.fullmatch(r"\d{1,2}", na=False) & validas), errors="coerce")
+    meses = partes.str[1].map(MESES_NUMERO).where(validas)
+    fechas = pd.to_datetime(pd.DataFrame({"year": ANIO, "month": meses, "day": dias}), errors="coerce")
+    return fechas.fillna(FECHA_POR_DEFECTO)
+
+def format_dates_iso(textos):
+    return pd.to_datetime(pd.Series(textos, dtype=object), format="%Y-%m-%d", errors="coerce").fillna(FECHA_POR_DEFECTO)
+
+def format_dates_santander(textos):
+    return pd.to_datetime(pd.Series(textos, dtype=object), format="%d-%b-%Y", errors="coerce").fillna(FECHA_POR_DEFECTO)
+
+def format_dates_banorte(textos):
+    # Sin fecha por defecto: armar_movimientos descarta los movimientos cuya fecha no se pudo convertir
+    return pd.to_datetime(pd.Series(textos, dtype=object), format="%d-%b-%y", errors="coerce")
+
+def armar_movimientos(movements, format_fechas):
+    # Los extractores guardan la fecha tal como viene en el texto; aquí se convierte toda la columna de una vez
+    # y se compactan los tipos: banco categórico, montos float64 y fecha datetime64
+    df = pd.DataFrame(movements)
+    if df.empty:
+        return df
+
+    df["fecha_operacion"] = format_fechas(df["fecha_operacion"]).to_numpy()
+    sin_fecha = df["fecha_operacion"].isna()
+    if sin_fecha.any():
+        logger.debug("⚠️ %s movimientos descartados por fecha inválida", sin_fecha.sum())
+        df = df[~sin_fecha].reset_index(drop=True)
+
+    df["banco"] = df["banco"].astype("category")
+    for columna in ("monto", "saldo_operacion"):
+        df[columna] = df[columna].astype("float64")
+    return df
 
 def extract_relevant_text(text, start_marker, end_marker):
     start_idx = text.find(start_marker)
@@ -46,35 +79,33 @@ def extract_movements(text, bank):
     lines = text.split('\n')
     movements = []
     buffer = ""
-    date_pattern = re.compile(r'\b(\d{2})[ /](ENE|FEB|MAR|ABR|MAY|JUN|JUL|AGO|SEP|OCT|NOV|DIC)\b')
     
     for line in lines:
         line = line.strip()
         if not line:
             continue
 
-        if re.search(r'\$\d{1,3}(?:,\d{3})*\.\d{2}', line):
+        fechas, montos = tokenizar(line, LINEA_SCOTIA)
+        if montos:
             if buffer:
                 line = buffer + " " + line
                 buffer = ""
+                fechas, montos = tokenizar(line, LINEA_SCOTIA)
         else:
             buffer += line + " "
             continue
 
         parts = line.split()
         if len(parts) < 6:
-            print("⚠️ Línea descartada por tener menos de 5 elementos")
+            logger.debug("⚠️ Línea descartada por tener menos de 5 elementos")
             continue
 
-        date_match = date_pattern.search(line)
-
-        if not date_match:
-            print("⚠️ No se encontró fecha en la línea")
+        if not fechas:
+            logger.debug("⚠️ No se encontró fecha en la línea")
             continue    
 
-        fecha = format_date(date_match.group())
-        #remaining_line = line.replace(date_match.group(0), "").strip()
-        remaining_parts = line.replace(date_match.group(0), "").strip().split()
+        fecha_texto = fechas[0].group()
+        remaining_parts = line.replace(fecha_texto, "").strip().split()
        
         if len(remaining_parts) < 3:
             continue
@@ -82,75 +113,65 @@ def extract_movements(text, bank):
         referencia = remaining_parts[-3] if bank == "Scotiabank" else None
         
         try:
-            monto = float(remaining_parts[-2].replace(',', '').replace('$', ''))
-            saldo = float(remaining_parts[-1].replace(',', '').replace('$', '')) if bank == "Scotiabank" else None
+            monto = a_numero(remaining_parts[-2])
+            saldo = a_numero(remaining_parts[-1]) if bank == "Scotiabank" else None
         except ValueError:
-            print(f"⚠️ Error al convertir monto/saldo en la línea: {line}")
+            logger.debug("⚠️ Error al convertir monto/saldo en la línea: %s", line)
             continue
         
-        etiqueta_predicha = predecir_etiqueta(descripcion, monto)
-        
         movements.append({
             "banco": bank,
-            "fecha_operacion": fecha,
+            "fecha_operacion": fecha_texto,
             "descripcion": descripcion,
             "referencia": referencia,
             "monto": monto,
-            "saldo_operacion": saldo,
-            "etiqueta": etiqueta_predicha
+            "saldo_operacion": saldo
         })
-    return pd.DataFrame(movements)
+    return armar_movimientos(movements, format_dates)
 
 def extract_bbva(text):
-    print("BANCOMER")
     text = extract_relevant_text(text, "Detalle de Movimientos Realizados", "Total de Movimientos")
     lines = text.split('\n')
     movements = []
-    date_pattern = re.compile(r'\d{2}/\w{3}')
 
     for line in lines:
-        if date_pattern.match(line.strip()):
+        if FECHA_BBVA_RE.match(line.strip()):
             parts = line.split()
             if len(parts) > 2:
                 oper_date = parts[0]
-                amounts = [part for part in parts if re.match(r'\d{1,3}(?:,\d{3})*\.\d{2}', part)]
-                description_end_index = parts.index(amounts[0]) if amounts else len(parts)
+                amounts = montos_en_tokens(parts)
+                if not amounts:
+                    continue
+                description_end_index = parts.index(amounts[0])
                 description = " ".join(parts[2:description_end_index])
 
                 cargo = "0"
                 abono = "0"
 
-                if any(keyword in description.lower() for keyword in ["abono", "depósito", "traspaso", "recibidos"]):
+                if any(keyword in description.lower() for keyword in BBVA_ABONOS):
                     abono = amounts[0]
                 else:
                     cargo = amounts[0]
 
-                etiqueta_predicha = predecir_etiqueta(description, amounts)
-
-                fecha = format_date(oper_date)
-
                 movements.append({
                     "banco": "BBVA",
-                    "fecha_operacion": fecha,
+                    "fecha_operacion": oper_date,
                     "descripcion": description,
                     "referencia": None,
-                    "monto": float(abono.replace(',', '').replace('$', '')) if abono != "0" else float(cargo.replace(',', '').replace('$', '')),
-                    "saldo_operacion": None,
-                    "etiqueta": etiqueta_predicha
+                    "monto": a_numero(abono) if abono != "0" else a_numero(cargo),
+                    "saldo_operacion": None
                 })
-    return pd.DataFrame(movements)
+    return armar_movimientos(movements, format_dates)
 
 def clean_banamex_text(text):
     
     lines = text.split("\n")
     cleaned_lines = []
 
-    problematic_pattern = re.compile(r"000180\.B07CHDA\d{3}\.OD\.\d{4}\.\d{2}")
-
     for line in lines:
         line = line.strip()
 
-        if problematic_pattern.search(line):
+        if BANAMEX_PROBLEMATICO_RE.search(line):
             continue
 
         cleaned_lines.append(line)
@@ -162,25 +183,18 @@ def clean_banamex_text(text):
 def extract_banamex(text):
 
     text_1 = extract_relevant_text(text,"DETALLE DE OPERACIONES","SALDO MINIMO REQUERIDO")
-    print(f"📄 Texto extraído antes de limpiar:\n{text_1[:1000]}")  # Solo los primeros 1000 caracteres para revisar
+    logger.debug("📄 Texto extraído antes de limpiar:\n%s", text_1[:1000])  # Solo los primeros 1000 caracteres para revisar
 
     lines = text.split('\n')
     movements = []
     buffer = ""
 
-    print("Banamex en extractor.py")
-
-    date_pattern = re.compile(r'\b\d{2} \b(JUL|ENE|FEB|MAR|ABR|MAY|JUN|AGO|SEP|OCT|NOV|DIC)\b', re.IGNORECASE)
-
     for line in lines:
         line = line.strip()
         if not line:
             continue
 
-        date_match = date_pattern.search(line)
-        amount_matches = re.findall(r'\d{1,3}(?:,\d{3})*\.\d{2}', line)
-
-        if date_match:
+        if FECHA_BANAMEX_RE.search(line):
             if buffer:
                 movements.append(process_banamex_line(buffer))
                 buffer = ""
@@ -190,58 +204,50 @@ def extract_banamex(text):
     if buffer:
         movements.append(process_banamex_line(buffer))
 
-    df = pd.DataFrame([m for m in movements if m])
+    df = armar_movimientos([m for m in movements if m], format_dates)
 
-    print(f"📊 Movimientos extraídos de Banamex: {len(df)} registros")
-    print(df.head())  # Muestra las primeras filas del DataFrame para verificar estructura
+    logger.debug("📊 Movimientos extraídos de Banamex: %s registros", len(df))
+    logger.debug("%s", df.head())  # Muestra las primeras filas del DataFrame para verificar estructura
 
     return df
 
 def process_banamex_line(line):
 
-    date_pattern = re.compile(r'\b\d{2} \b(JUL|ENE|FEB|MAR|ABR|MAY|JUN|AGO|SEP|OCT|NOV|DIC)\b', re.IGNORECASE)
-    amount_pattern = re.compile(r'\d{1,3}(?:,\d{3})*\.\d{2}')
-
-    date_match = date_pattern.search(line)
-    if not date_match:
+    fechas, montos = tokenizar(line, LINEA_BANAMEX)
+    if not fechas:
         return None
     
-    fecha = format_date(date_match.group())
-    amount_matches = amount_pattern.findall(line)
+    fecha_texto = fechas[0].group()
+    amount_matches = [match.group() for match in montos]
 
     if not amount_matches:
         return None
     
     if len(amount_matches) == 1:
-        monto = float(amount_matches[0].replace(",", ""))
+        monto = a_numero(amount_matches[0])
         saldo = None
     elif len(amount_matches) == 2:
-        monto = float(amount_matches[0].replace(",", ""))
-        saldo = float(amount_matches[1].replace(",", ""))
+        monto = a_numero(amount_matches[0])
+        saldo = a_numero(amount_matches[1])
     elif len(amount_matches) == 3:
-        monto = float(amount_matches[1].replace(",", ""))
-        saldo = float(amount_matches[2].replace(",", ""))
+        monto = a_numero(amount_matches[1])
+        saldo = a_numero(amount_matches[2])
     else:
-        print(f"⚠️ Demasiados montos detectados en la línea: {line}")
+        logger.debug("⚠️ Demasiados montos detectados en la línea: %s", line)
         return None
 
-    descripcion = line.replace(date_match.group(), "").strip()
-    for amt in amount_matches:
-        descripcion = descripcion.replace(amt, "").strip()
-
-    etiqueta_predicha = predecir_etiqueta(descripcion, monto)
+    descripcion = quitar_coincidencias(line, [f for f in fechas if f.group() == fecha_texto] + montos)
 
     movimiento = {
         "banco": "Banamex",
-        "fecha_operacion": fecha,
+        "fecha_operacion": fecha_texto,
         "descripcion": descripcion,
         "referencia": None,
         "monto": monto,
-        "saldo_operacion": saldo,
-        "etiqueta": etiqueta_predicha
+        "saldo_operacion": saldo
     }
 
-    print(f"📝 Movimiento procesado: {movimiento}")
+    logger.debug("📝 Movimiento procesado: %s", movimiento)
 
     return movimiento
 
@@ -251,53 +257,46 @@ def extract_banregio(text):
     lines = text.split('\n')
     movements = []
 
-    date_pattern = re.compile(r'\b\d{1,2}\b')
-    amount_pattern = re.compile(r'\d{1,3}(?:,\d{3})*\.\d{2}')
-
     for line in lines:
         line = line.strip()
-        if not line or not date_pattern.match(line.split()[0]):
+        if not line:
             continue
 
         parts = line.split()
+        if not DIA_RE.match(parts[0]):
+            continue
         day = parts[0]
 
-        amounts = [p for p in parts if amount_pattern.match(p)]
+        amounts = montos_en_tokens(parts)
         if len(amounts) > 2:
-            print(f"⚠️ Línea ignorada por falta de montos: {line}")
+            logger.debug("⚠️ Línea ignorada por falta de montos: %s", line)
             continue
         
         try:
-            saldo = float(amounts[-1].replace(',', ''))
-            monto = float(amounts[-2].replace(',', ''))
+            saldo = a_numero(amounts[-1])
+            monto = a_numero(amounts[-2])
         except IndexError:
-            print(f"⚠️ Error procesando montos en línea: {line}")
+            logger.debug("⚠️ Error procesando montos en línea: %s", line)
             continue
 
         concepto = " ".join(parts[1:-len(amounts)])
 
-        fecha = format_date(day) if day.isdigit() else "2024-01-01"
-        etiqueta_predicha = predecir_etiqueta(concepto, monto)
-
+        # Solo trae el día, sin mes: queda en FECHA_POR_DEFECTO como antes
         movements.append({
             "banco": "Banregio",
-            "fecha_operacion": fecha,
+            "fecha_operacion": day,
             "descripcion": concepto,
             "referencia": None,
             "monto": monto,
-            "saldo_operacion": saldo,
-            "etiqueta": etiqueta_predicha
+            "saldo_operacion": saldo
         })
     
-    return pd.DataFrame(movements)
+    return armar_movimientos(movements, format_dates)
 
 def extract_azteca(text):
     lines = text.split('\n')
     movements = []
 
-    date_pattern = re.compile(r'\d{4}-\d{2}-\d{2}')
-    amount_pattern = re.compile(r'\d{1,3}(?:,\d{3})*\.\d{2}')
-
     for line in lines:
         line = line.strip()
         if not line:
@@ -308,7 +307,7 @@ def extract_azteca(text):
             continue
 
         fecha_operacion = parts[0]
-        if not date_pattern.match(fecha_operacion):
+        if not FECHA_ISO_RE.match(fecha_operacion):
             continue
 
         concepto = " ".join(parts[4:-3])
@@ -318,24 +317,21 @@ def extract_azteca(text):
         saldo = parts[-1]
 
         try:
-            monto = float(abonos.replace(',', '')) if abonos != '0.00' else float(cargos.replace(',', ''))
-            saldo = float(saldo.replace(',', ''))
+            monto = a_numero(abonos) if abonos != '0.00' else a_numero(cargos)
+            saldo = a_numero(saldo)
         except ValueError:
             continue
 
-        etiqueta_predicha = predecir_etiqueta(concepto, monto)
-
         movements.append({
             "banco": "Banco Azteca",
             "fecha_operacion": fecha_operacion,
             "descripcion": concepto,
             "referencia": None,
             "monto": monto,
-            "saldo_operacion": saldo,
-            "etiqueta": etiqueta_predicha
+            "saldo_operacion": saldo
         })
 
-    return pd.DataFrame(movements)
+    return armar_movimientos(movements, format_dates_iso)
 
 def extract_inbursa(text):
     start_marker = "DETALLE DE MOVIMIENTOS"
@@ -345,11 +341,10 @@ def extract_inbursa(text):
 
     lines = text.split('\n')
     movements = []
-    date_pattern = re.compile(r'\b\b(JUL|ENE|FEB|MAR|ABR|MAY|JUN|AGO|SEP|OCT|NOV|DIC)\s+\d{2}\b', re.IGNORECASE)
 
     for line in lines:
         line = line.strip()
-        if not line or not date_pattern.search(line):
+        if not line or not FECHA_INBURSA_RE.search(line):
             continue
 
         parts = line.split()
@@ -357,35 +352,26 @@ def extract_inbursa(text):
             continue
 
         try:
-            fecha = format_date(parts[0] + " " + parts[1])
+            fecha = parts[0] + " " + parts[1]
             referencia = parts[2] if parts[2].isdigit() else None
             descripcion_start = 3 if referencia else 2
             descripcion = " ".join(parts[descripcion_start:-2])
-            monto = float(parts[-2].replace(',', '').replace('$', ''))
-            saldo = float(parts[-1].replace(',', '').replace('$', ''))
+            monto = a_numero(parts[-2])
+            saldo = a_numero(parts[-1])
 
         except ValueError:
-            print(f"⚠️ Error al procesar la línea: {line}")
+            logger.debug("⚠️ Error al procesar la línea: %s", line)
             continue
 
-        eitqueta_predicha = predecir_etiqueta(descripcion, monto)
-
         movements.append({
             "banco": "Inbursa",
             "fecha_operacion": fecha,
             "descripcion": descripcion,
             "referencia": referencia,
             "monto": monto,
-            "saldo_operacion": saldo,
-            "etiqueta": eitqueta_predicha
+            "saldo_operacion": saldo
         })
-    return pd.DataFrame(movements)
-
-def format_date_santander(date_str):
-    try:
-        return datetime.strptime(date_str, "%d-%b-%Y").strftime("%Y-%m-%d")
-    except ValueError:
-        return "2024.01.01"
+    return armar_movimientos(movements, format_dates)
 
 def extract_santander(text):
     # Extraer todas las páginas correctamente
@@ -402,19 +388,17 @@ def extract_santander(text):
             sections.append(extracted_text)
     
     if not sections:
-        print("⚠️ No se encontraron secciones de movimientos en el estado de cuenta de Santander.")
+        logger.warning("⚠️ No se encontraron secciones de movimientos en el estado de cuenta de Santander.")
         return pd.DataFrame()
     
     # Unir todas las secciones extraídas
     text = "\n".join(sections)
     lines = text.split('\n')
     if not lines:
-        print("⚠️ No se encontraron líneas de movimientos.")
+        logger.warning("⚠️ No se encontraron líneas de movimientos.")
         return pd.DataFrame()
     
     movements = []
-    date_pattern = re.compile(r'\d{2}-[A-Za-z]{3}-\d{4}')
-    amount_pattern = re.compile(r'\d{1,3}(?:,\d{3})*\.\d{2}')
     
     for line in lines:
         if not isinstance(line, str):
@@ -424,83 +408,64 @@ def extract_santander(text):
         if not line or end_marker in line:
             continue
         
-        date_match = date_pattern.search(line)
-        amount_matches = amount_pattern.findall(line)
+        fechas, montos = tokenizar(line, LINEA_SANTANDER)
         
-        if not date_match or len(amount_matches) < 1:
+        if not fechas or len(montos) < 2:
             continue
         
-        fecha = format_date_santander(date_match.group())
+        fecha_texto = fechas[0].group()
         
         try:
-            monto = float(amount_matches[-2].replace(',', ''))
-            saldo = float(amount_matches[-1].replace(',', '')) if len(amount_matches) > 1 else None
+            monto = a_numero(montos[-2].group())
+            saldo = a_numero(montos[-1].group())
         except ValueError:
             continue
         
-        descripcion = line.replace(date_match.group(), "").strip()
-        for amt in amount_matches:
-            descripcion = descripcion.replace(amt, "").strip()
-        
-        etiqueta_predicha = predecir_etiqueta(descripcion, monto)
+        descripcion = quitar_coincidencias(line, [f for f in fechas if f.group() == fecha_texto] + montos)
         
         movements.append({
             "banco": "Santander",
-            "fecha_operacion": fecha,
+            "fecha_operacion": fecha_texto,
             "descripcion": descripcion,
             "referencia": None,
             "monto": monto,
-            "saldo_operacion": saldo,
-            "etiqueta": etiqueta_predicha
+            "saldo_operacion": saldo
         })
     
-    return pd.DataFrame(movements)
-
-def format_date_banorte(date_str):
-    try:
-        return datetime.strptime(date_str, "%d-%b-%y").strftime("%Y-%m-%d")
-    except ValueError:
-        print(f"⚠️ Error al convertir fecha: {date_str} - Formato incorrecto")
-        return None
+    return armar_movimientos(movements, format_dates_santander)
 
 def extract_banorte(text):
     lines = text.split('\n')
     movements = []
 
-    date_pattern = re.compile(r'\d{2}-[A-Z]{3}-\d{2}')
-    amount_pattern = re.compile(r'\d{1,3}(?:,\d{3})*\.\d{2}')
-
     for line in lines:
         line = line.strip()
         if not line:
             continue
 
-        date_match = date_pattern.match(line)
+        date_match = FECHA_BANORTE_RE.match(line)
         if not date_match:
             continue
 
-        fecha = format_date_banorte(date_match.group())
-        if not fecha:
-            continue
+        fecha = date_match.group()
 
         remamining_line = line.replace(date_match.group(), "").strip()
         parts = remamining_line.split()
 
-        amounts = [p for p in parts if amount_pattern.match(p)]
+        amounts = montos_en_tokens(parts)
 
         if len(amounts) < 2:
-            print(f"⚠️ No se encontraron montos en la línea: {line}")
+            logger.debug("⚠️ No se encontraron montos en la línea: %s", line)
             continue
 
         try:
-            monto = float(amounts[-2].replace(',', ''))
-            saldo = float(amounts[-1].replace(',', ''))
+            monto = a_numero(amounts[-2])
+            saldo = a_numero(amounts[-1])
         except ValueError:
-            print("⚠️ Error al convertir montos en la línea: {line}")
+            logger.debug("⚠️ Error al convertir montos en la línea: %s", line)
+            continue
 
         descripcion = " ".join(parts[:-2])
-       
-        etiqueta_predicha = predecir_etiqueta(descripcion, monto)
 
         movements.append({
             "banco": "Banorte",
@@ -508,8 +473,7 @@ def extract_banorte(text):
             "descripcion": descripcion,
             "referencia": None,
             "monto": monto,
-            "saldo_operacion": saldo,
-            "etiqueta": etiqueta_predicha
+            "saldo_operacion": saldo
         })
 
-    return pd.DataFrame(movements)
\ No newline at end of file
+    return armar_movimientos(movements, format_dates_banorte)
\ No newline at end of file
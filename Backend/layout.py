@@ -0,0 +1,236 @@
+import logging
+import os
+import re
+from extractor import format_dates, format_dates_iso, format_dates_santander, format_dates_banorte, armar_movimientos
+from tokenizador import MESES, MONTO, a_numero
+from pdf_text import abrir_pdf
+
+# Motor alternativo a los extractores de texto: usa las coordenadas de cada palabra que
+# entrega pdfplumber para asignar cargo, abono y saldo por columna en lugar de inferirlos
+# por el orden de los montos en la línea.
+
+logger = logging.getLogger(__name__)
+
+MONTO_EXACTO_RE = re.compile(rf"\$?{MONTO}")
+TOLERANCIA_FILA = 3
+
+# Rangos en puntos PDF. Los montos van alineados a la derecha, así que se ubican por x1;
+# fecha, referencia y descripción se ubican por x0.
+LAYOUTS = {
+    "Banco Azteca": {
+        "encabezado": "Concepto Cargo Abono Saldo",
+        "fecha": re.compile(r"\d{4}-\d{2}-\d{2}"),
+        "formato_fecha": format_dates_iso,
+        "fecha_x": (0, 55),
+        "descripcion_x": (205, 380),
+        "cargo_x": (380, 450),
+        "abono_x": (450, 530),
+        "saldo_x": (530, 600),
+        "continuacion": False,
+    },
+    "Banorte": {
+        "encabezado": "MONTO DEL DEPOSITO MONTO DEL RETIRO SALDO",
+        "fecha": re.compile(r"\d{2}-[A-Z]{3}-\d{2}"),
+        "formato_fecha": format_dates_banorte,
+        "fecha_x": (45, 80),
+        "descripcion_x": (45, 380),
+        "abono_x": (380, 440),
+        "cargo_x": (440, 510),
+        "saldo_x": (510, 600),
+        "continuacion": False,
+    },
+    "Santander": {
+        "encabezado": "DEPOSITO RETIRO SALDO",
+        "fin": "SALDO FINAL DEL PERIODO",
+        "fecha": re.compile(r"\d{2}-[A-Za-z]{3}-\d{4}"),
+        "formato_fecha": format_dates_santander,
+        "fecha_x": (25, 80),
+        "descripcion_x": (80, 370),
+        "abono_x": (370, 440),
+        "cargo_x": (440, 510),
+        "saldo_x": (510, 600),
+        "continuacion": False,
+    },
+    "Inbursa": {
+        "encabezado": "CARGOS ABONOS SALDO",
+        "fin": "RESUMEN DEL CFDI",
+        "fecha": re.compile(rf"(?:{MESES})\s+\d{{2}}", re.IGNORECASE),
+        "formato_fecha": lambda textos: format_dates(textos.str.split().str[::-1].str.join(" ")),
+        "fecha_x": (0, 45),
+        "referencia_x": (45, 140),
+        "descripcion_x": (140, 390),
+        "cargo_x": (390, 450),
+        "abono_x": (450, 520),
+        "saldo_x": (520, 600),
+        "continuacion": False,
+    },
+    "Banamex": {
+        "encabezado": "RETIROS DEPOSITOS SALDO",
+        "fin": "SALDO MINIMO REQUERIDO",
+        "fecha": re.compile(rf"\d{{2}}\s+(?:{MESES})", re.IGNORECASE),
+        "formato_fecha": format_dates,
+        "fecha_x": (0, 50),
+        "descripcion_x": (50, 260),
+        "cargo_x": (260, 340),
+        "abono_x": (340, 410),
+        "saldo_x": (410, 600),
+        "continuacion": True,
+    },
+}
+
+
+# Bancos que usan este motor, separados por coma ("todos" para todos los que tienen layout)
+MOTOR_LAYOUT = os.environ.get("MOTOR_LAYOUT", "")
+
+
+def usa_layout(banco):
+    if banco not in LAYOUTS:
+        return False
+    seleccion = {nombre.strip() for nombre in MOTOR_LAYOUT.split(",") if nombre.strip()}
+    return "todos" in seleccion or banco in seleccion
+
+
+def _en_rango(valor, rango):
+    return rango is not None and rango[0] <= valor < rango[1]
+
+
+def _compacto(texto):
+    # Algunos PDFs (Santander) pegan las palabras; los marcadores se comparan sin espacios
+    return texto.replace(" ", "")
+
+
+def _filas(words):
+    # Agrupa palabras en filas por su coordenada vertical, con una tolerancia de unos puntos
+    filas = []
+    for word in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        if filas and word["top"] - filas[-1]["top"] <= TOLERANCIA_FILA:
+            filas[-1]["words"].append(word)
+        else:
+            filas.append({"top": word["top"], "words": [word]})
+    for fila in filas:
+        fila["words"].sort(key=lambda w: w["x0"])
+        fila["texto"] = _compacto("".join(w["text"] for w in fila["words"]))
+    return filas
+
+
+def _movimiento_vacio(fecha):
+    return {
+        "fecha": fecha,
+        "descripcion": [],
+        "referencia": None,
+        "cargo": None,
+        "abono": None,
+        "saldo": None,
+        "fecha_words": [],
+    }
+
+
+def _nuevo_movimiento(fila, layout):
+    fecha_words = [w for w in fila["words"] if _en_rango(w["x0"], layout["fecha_x"])]
+    fecha_texto = " ".join(w["text"] for w in fecha_words)
+    fecha_match = layout["fecha"].match(fecha_texto)
+    if not fecha_match:
+        return None
+
+    # Lo que queda pegado a la fecha (p. ej. "01-JUN-24COMPRA") es parte de la descripción
+    resto = fecha_texto[fecha_match.end():].strip()
+    movimiento = _movimiento_vacio(fecha_match.group())
+    movimiento["descripcion"] = [resto] if resto else []
+    movimiento["fecha_words"] = fecha_words
+    return movimiento
+
+
+def _agregar_fila(movimiento, fila, layout, es_primera):
+    # Sin continuación, las filas siguientes (datos de SPEI, totales, pies de página) no aportan nada
+    if not es_primera and not layout["continuacion"]:
+        return
+
+    for word in fila["words"]:
+        if es_primera and word in movimiento["fecha_words"]:
+            continue
+
+        if MONTO_EXACTO_RE.fullmatch(word["text"]):
+            for columna in ("cargo", "abono", "saldo"):
+                if _en_rango(word["x1"], layout.get(f"{columna}_x")) and movimiento[columna] is None:
+                    movimiento[columna] = word["text"]
+                    break
+            else:
+                if _en_rango(word["x0"], layout["descripcion_x"]):
+                    movimiento["descripcion"].append(word["text"])
+            continue
+
+        if es_primera and _en_rango(word["x0"], layout.get("referencia_x")):
+            if movimiento["referencia"] is None and word["text"].isdigit():
+                movimiento["referencia"] = word["text"]
+        elif _en_rango(word["x0"], layout["descripcion_x"]):
+            movimiento["descripcion"].append(word["text"])
+
+
+def _cerrar_movimiento(movimiento, banco, layout, movements):
+    if movimiento is None:
+        return
+
+    try:
+        cargo = a_numero(movimiento["cargo"]) if movimiento["cargo"] else 0.0
+        abono = a_numero(movimiento["abono"]) if movimiento["abono"] else 0.0
+        saldo = a_numero(movimiento["saldo"]) if movimiento["saldo"] else None
+    except ValueError:
+        logger.debug("⚠️ Error al convertir montos del movimiento: %s", movimiento)
+        return
+
+    # Las columnas vacías o en 0.00 no cuentan; sin cargo ni abono la fila no es un movimiento
+    monto = abono or cargo
+    if not monto:
+        return
+
+    # La fecha se convierte para toda la tabla al final, en armar_movimientos
+    movements.append({
+        "banco": banco,
+        "fecha_operacion": movimiento["fecha"],
+        "descripcion": " ".join(movimiento["descripcion"]),
+        "referencia": movimiento["referencia"],
+        "monto": monto,
+        "saldo_operacion": saldo
+    })
+
+
+def extraer_movimientos_layout(pdf, banco):
+    layout = LAYOUTS[banco]
+    movements = []
+    movimiento = None
+
+    for page in pdf.pages:
+        # Solo se leen las filas debajo del encabezado de la tabla de cada página
+        en_tabla = False
+        for fila in _filas(page.extract_words()):
+            if not en_tabla:
+                en_tabla = _compacto(layout["encabezado"]) in fila["texto"]
+                continue
+
+            # El fin de una tabla no es el fin del documento (Banamex trae una tabla por contrato)
+            if layout.get("fin") and _compacto(layout["fin"]) in fila["texto"]:
+                _cerrar_movimiento(movimiento, banco, layout, movements)
+                movimiento = None
+                en_tabla = False
+                continue
+
+            nuevo = _nuevo_movimiento(fila, layout)
+            if nuevo is not None:
+                _cerrar_movimiento(movimiento, banco, layout, movements)
+                movimiento = nuevo
+                _agregar_fila(movimiento, fila, layout, es_primera=True)
+            elif movimiento is not None:
+                if layout["continuacion"] and (movimiento["cargo"] or movimiento["abono"]):
+                    # Banamex solo imprime la fecha en el primer movimiento del día: el monto cierra
+                    # el movimiento y la siguiente fila sin fecha abre otro con la misma fecha
+                    _cerrar_movimiento(movimiento, banco, layout, movements)
+                    movimiento = _movimiento_vacio(movimiento["fecha"])
+                _agregar_fila(movimiento, fila, layout, es_primera=False)
+
+    _cerrar_movimiento(movimiento, banco, layout, movements)
+    return armar_movimientos(movements, layout["formato_fecha"])
+
+
+def extract_layout(filepath, banco):
+    with abrir_pdf(filepath) as pdf:
+        return extraer_movimientos_layout(pdf, banco)
@@ -0,0 +1,93 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Métricas en memoria del proceso de Flask, expuestas en formato de texto de Prometheus en /metrics.
+# Las etapas que corren en el pool de procesos se miden allá y se registran aquí con sus tiempos.
+
+PREFIJO = "exportar_pdf"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Rangos de tamaño de archivo: pocos valores para no multiplicar las series
+TAMANOS = ((1024 * 1024, "<1MB"), (5 * 1024 * 1024, "1-5MB"), (20 * 1024 * 1024, "5-20MB"))
+
+_histogramas = {}
+_contadores = {}
+_lock = threading.Lock()
+
+
+def tamano_archivo(num_bytes):
+    for limite, etiqueta in TAMANOS:
+        if num_bytes < limite:
+            return etiqueta
+    return ">20MB"
+
+
+def _llave(labels):
+    return tuple(sorted((clave, str(valor)) for clave, valor in labels.items()))
+
+
+def observar(etapa, segundos, **labels):
+    llave = _llave({"etapa": etapa, **labels})
+    with _lock:
+        histograma = _histogramas.setdefault(llave, {"buckets": [0] * len(BUCKETS), "suma": 0.0, "cuenta": 0})
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                histograma["buckets"][i] += 1
+        histograma["suma"] += segundos
+        histograma["cuenta"] += 1
+
+
+def observar_tiempos(tiempos, **labels):
+    for etapa, segundos in tiempos.items():
+        observar(etapa, segundos, **labels)
+
+
+def incrementar(nombre, valor=1, **labels):
+    llave = (nombre, _llave(labels))
+    with _lock:
+        _contadores[llave] = _contadores.get(llave, 0) + valor
+
+
+@contextmanager
+def medir(etapa, **labels):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(etapa, time.perf_counter() - inicio, **labels)
+
+
+def medir_iterable(etapa, iterable, **labels):
+    # Para respuestas en streaming: mide hasta que se consume el último bloque
+    with medir(etapa, **labels):
+        yield from iterable
+
+
+def _formatear_labels(llave, extra=()):
+    pares = list(llave) + list(extra)
+    if not pares:
+        return ""
+    contenido = ",".join(f'{clave}="{valor}"' for clave, valor in pares)
+    return "{" + contenido + "}"
+
+
+def exponer():
+    nombre_histograma = f"{PREFIJO}_etapa_segundos"
+    lineas = [
+        f"# HELP {nombre_histograma} Duración de cada etapa del procesamiento por banco y tamaño de archivo",
+        f"# TYPE {nombre_histograma} histogram",
+    ]
+    with _lock:
+        for llave, histograma in sorted(_histogramas.items()):
+            for limite, cuenta in zip(BUCKETS, histograma["buckets"]):
+                lineas.append(f"{nombre_histograma}_bucket{_formatear_labels(llave, [('le', limite)])} {cuenta}")
+            lineas.append(f"{nombre_histograma}_bucket{_formatear_labels(llave, [('le', '+Inf')])} {histograma['cuenta']}")
+            lineas.append(f"{nombre_histograma}_sum{_formatear_labels(llave)} {histograma['suma']}")
+            lineas.append(f"{nombre_histograma}_count{_formatear_labels(llave)} {histograma['cuenta']}")
+
+        for nombre in sorted({nombre for nombre, _ in _contadores}):
+            lineas.append(f"# TYPE {PREFIJO}_{nombre} counter")
+            for (nombre_contador, llave), valor in sorted(_contadores.items()):
+                if nombre_contador == nombre:
+                    lineas.append(f"{PREFIJO}_{nombre}{_formatear_labels(llave)} {valor}")
+    return "\n".join(lineas) + "\n"
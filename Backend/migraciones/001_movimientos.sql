@@ -0,0 +1,11 @@
+-- Esquema base de la tabla centralizada de movimientos
+CREATE TABLE IF NOT EXISTS movimientos (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    banco VARCHAR(50),
+    fecha_operacion DATE,
+    descripcion TEXT,
+    referencia VARCHAR(100),
+    monto DECIMAL(15, 2),
+    saldo_operacion DECIMAL(15, 2) NULL,
+    etiqueta VARCHAR(50)
+);
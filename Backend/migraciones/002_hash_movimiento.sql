@@ -0,0 +1,4 @@
+-- Huella SHA-256 de cada movimiento para rechazar filas repetidas.
+-- Las filas anteriores quedan con NULL, que el índice único permite repetir.
+ALTER TABLE movimientos ADD COLUMN hash_movimiento CHAR(64) NULL;
+CREATE UNIQUE INDEX ux_movimientos_hash ON movimientos (hash_movimiento);
@@ -0,0 +1,87 @@
+-- Índices para las consultas de /movements y partición mensual por fecha_operacion.
+-- En una tabla particionada toda llave única debe incluir la columna de partición,
+-- así que fecha_operacion entra a la llave primaria y al índice único del hash
+-- (la huella ya incluye la fecha, por lo que la unicidad no cambia).
+
+-- La llave primaria no admite NULL: se usa la misma fecha por defecto que los extractores
+UPDATE movimientos SET fecha_operacion = '2024-01-01' WHERE fecha_operacion IS NULL;
+
+ALTER TABLE movimientos
+    MODIFY fecha_operacion DATE NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, fecha_operacion);
+
+DROP INDEX ux_movimientos_hash ON movimientos;
+CREATE UNIQUE INDEX ux_movimientos_hash ON movimientos (hash_movimiento, fecha_operacion);
+
+-- Índices de cobertura para la paginación por llave (fecha_operacion, id): la página se
+-- resuelve solo con el índice y después se leen las filas completas de esa página
+CREATE INDEX ix_movimientos_fecha ON movimientos (fecha_operacion, id);
+CREATE INDEX ix_movimientos_banco_fecha ON movimientos (banco, fecha_operacion, id);
+CREATE INDEX ix_movimientos_etiqueta_fecha ON movimientos (etiqueta, fecha_operacion, id);
+CREATE INDEX ix_movimientos_banco_etiqueta_fecha ON movimientos (banco, etiqueta, fecha_operacion, id);
+
+-- Una partición por mes, los meses siguientes se agregan partiendo pmax con "python db.py particiones"
+ALTER TABLE movimientos PARTITION BY RANGE COLUMNS (fecha_operacion) (
+    PARTITION p2023_01 VALUES LESS THAN ('2023-02-01'),
+    PARTITION p2023_02 VALUES LESS THAN ('2023-03-01'),
+    PARTITION p2023_03 VALUES LESS THAN ('2023-04-01'),
+    PARTITION p2023_04 VALUES LESS THAN ('2023-05-01'),
+    PARTITION p2023_05 VALUES LESS THAN ('2023-06-01'),
+    PARTITION p2023_06 VALUES LESS THAN ('2023-07-01'),
+    PARTITION p2023_07 VALUES LESS THAN ('2023-08-01'),
+    PARTITION p2023_08 VALUES LESS THAN ('2023-09-01'),
+    PARTITION p2023_09 VALUES LESS THAN ('2023-10-01'),
+    PARTITION p2023_10 VALUES LESS THAN ('2023-11-01'),
+    PARTITION p2023_11 VALUES LESS THAN ('2023-12-01'),
+    PARTITION p2023_12 VALUES LESS THAN ('2024-01-01'),
+    PARTITION p2024_01 VALUES LESS THAN ('2024-02-01'),
+    PARTITION p2024_02 VALUES LESS THAN ('2024-03-01'),
+    PARTITION p2024_03 VALUES LESS THAN ('2024-04-01'),
+    PARTITION p2024_04 VALUES LESS THAN ('2024-05-01'),
+    PARTITION p2024_05 VALUES LESS THAN ('2024-06-01'),
+    PARTITION p2024_06 VALUES LESS THAN ('2024-07-01'),
+    PARTITION p2024_07 VALUES LESS THAN ('2024-08-01'),
+    PARTITION p2024_08 VALUES LESS THAN ('2024-09-01'),
+    PARTITION p2024_09 VALUES LESS THAN ('2024-10-01'),
+    PARTITION p2024_10 VALUES LESS THAN ('2024-11-01'),
+    PARTITION p2024_11 VALUES LESS THAN ('2024-12-01'),
+    PARTITION p2024_12 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p2025_01 VALUES LESS THAN ('2025-02-01'),
+    PARTITION p2025_02 VALUES LESS THAN ('2025-03-01'),
+    PARTITION p2025_03 VALUES LESS THAN ('2025-04-01'),
+    PARTITION p2025_04 VALUES LESS THAN ('2025-05-01'),
+    PARTITION p2025_05 VALUES LESS THAN ('2025-06-01'),
+    PARTITION p2025_06 VALUES LESS THAN ('2025-07-01'),
+    PARTITION p2025_07 VALUES LESS THAN ('2025-08-01'),
+    PARTITION p2025_08 VALUES LESS THAN ('2025-09-01'),
+    PARTITION p2025_09 VALUES LESS THAN ('2025-10-01'),
+    PARTITION p2025_10 VALUES LESS THAN ('2025-11-01'),
+    PARTITION p2025_11 VALUES LESS THAN ('2025-12-01'),
+    PARTITION p2025_12 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p2026_01 VALUES LESS THAN ('2026-02-01'),
+    PARTITION p2026_02 VALUES LESS THAN ('2026-03-01'),
+    PARTITION p2026_03 VALUES LESS THAN ('2026-04-01'),
+    PARTITION p2026_04 VALUES LESS THAN ('2026-05-01'),
+    PARTITION p2026_05 VALUES LESS THAN ('2026-06-01'),
+    PARTITION p2026_06 VALUES LESS THAN ('2026-07-01'),
+    PARTITION p2026_07 VALUES LESS THAN ('2026-08-01'),
+    PARTITION p2026_08 VALUES LESS THAN ('2026-09-01'),
+    PARTITION p2026_09 VALUES LESS THAN ('2026-10-01'),
+    PARTITION p2026_10 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p2026_11 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p2026_12 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p2027_01 VALUES LESS THAN ('2027-02-01'),
+    PARTITION p2027_02 VALUES LESS THAN ('2027-03-01'),
+    PARTITION p2027_03 VALUES LESS THAN ('2027-04-01'),
+    PARTITION p2027_04 VALUES LESS THAN ('2027-05-01'),
+    PARTITION p2027_05 VALUES LESS THAN ('2027-06-01'),
+    PARTITION p2027_06 VALUES LESS THAN ('2027-07-01'),
+    PARTITION p2027_07 VALUES LESS THAN ('2027-08-01'),
+    PARTITION p2027_08 VALUES LESS THAN ('2027-09-01'),
+    PARTITION p2027_09 VALUES LESS THAN ('2027-10-01'),
+    PARTITION p2027_10 VALUES LESS THAN ('2027-11-01'),
+    PARTITION p2027_11 VALUES LESS THAN ('2027-12-01'),
+    PARTITION p2027_12 VALUES LESS THAN ('2028-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
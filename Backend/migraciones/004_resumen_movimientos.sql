@@ -0,0 +1,12 @@
+-- Totales por mes, banco y etiqueta que db.insert_data actualiza en la misma transacción
+-- que inserta los movimientos. "python db.py resumen" la reconstruye desde movimientos.
+CREATE TABLE IF NOT EXISTS resumen_movimientos (
+    mes DATE NOT NULL,
+    banco VARCHAR(50) NOT NULL,
+    etiqueta VARCHAR(50) NOT NULL,
+    depositos DECIMAL(17, 2) NOT NULL DEFAULT 0,
+    retiros DECIMAL(17, 2) NOT NULL DEFAULT 0,
+    total DECIMAL(17, 2) NOT NULL DEFAULT 0,
+    movimientos INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (mes, banco, etiqueta)
+);
@@ -1,21 +1,164 @@
+import hashlib
 import joblib
+import logging
 import pandas as pd
 import os
+import threading
+from collections import OrderedDict
 
-model_path = os.path.join(os.path.dirname(__file__), "modelo_movimientos.pkl")
-modelo = joblib.load(model_path)
+logger = logging.getLogger(__name__)
 
+# Artefactos que genera training_model.py; MODELO elige cuál se usa para etiquetar
+MODELOS = {
+    "completo": "modelo_movimientos.pkl",
+    "compacto": "modelo_movimientos_compacto.pkl",
+    "incremental": "modelo_movimientos_incremental.pkl",
+}
+MODELO = os.environ.get("MODELO", "completo")
+model_path = os.path.join(os.path.dirname(__file__), MODELOS.get(MODELO, MODELO))
+# MODEL_MMAP_MODE=r mapea en memoria los arreglos numpy del pickle (compartidos entre procesos). Solo es seguro si
+# el .pkl se reemplaza con os.replace, como hace training_model.py; reescribirlo encima cambia el modelo en uso
+MODEL_MMAP_MODE = os.environ.get("MODEL_MMAP_MODE") or None
 
-def predecir_etiqueta(descripcion, monto):
-    datos = pd.DataFrame([{ "descripcion": descripcion, "monto": monto }])
+# Caché LRU de etiquetas por descripción + monto normalizados; 0 la desactiva
+CACHE_ETIQUETAS_MAX = int(os.environ.get("CACHE_ETIQUETAS_MAX", 50000))
+# Con CACHE_ETIQUETAS_DISCO=1 la caché se guarda entre reinicios, un archivo por versión del modelo
+CACHE_ETIQUETAS_DISCO = os.environ.get("CACHE_ETIQUETAS_DISCO", "0") == "1"
+CACHE_ETIQUETAS_FOLDER = os.environ.get("CACHE_ETIQUETAS_FOLDER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "etiquetas"))
+
+_modelo = None
+_huella_modelo = None
+_modelo_lock = threading.Lock()
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+# Etiquetas nuevas de este proceso que aún no están en la caché en disco
+_pendientes_disco = {}
+
+
+def _huella(path):
+    # SHA-256 del archivo del modelo: si el .pkl cambia, la caché en disco anterior ya no aplica
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _cache_path():
+    return os.path.join(CACHE_ETIQUETAS_FOLDER, f"{_huella_modelo}.pkl")
+
+
+def _leer_archivo_cache(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_pickle(path)
+    except Exception as e:
+        logger.warning("⚠️ Caché de etiquetas ilegible (%s): %s", path, e)
+        return None
+
+
+def _leer_cache_disco():
+    guardadas = _leer_archivo_cache(_cache_path())
+    if guardadas is None:
+        return
+    with _cache_lock:
+        _cache.update(guardadas)
+        while len(_cache) > CACHE_ETIQUETAS_MAX:
+            _cache.popitem(last=False)
+
+
+def _guardar_cache_disco():
+    # Cada proceso del pool solo agrega sus etiquetas nuevas a lo que ya está en disco, en lugar de
+    # reemplazar el archivo con su propia caché y borrar lo que guardaron los demás
+    with _cache_lock:
+        nuevas = dict(_pendientes_disco)
+        _pendientes_disco.clear()
+    if not nuevas:
+        return
+    os.makedirs(CACHE_ETIQUETAS_FOLDER, exist_ok=True)
+    path = _cache_path()
+    guardadas = _leer_archivo_cache(path) or OrderedDict()
+    guardadas.update(nuevas)
+    while len(guardadas) > CACHE_ETIQUETAS_MAX:
+        guardadas.popitem(last=False)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pd.to_pickle(guardadas, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def cargar_modelo():
+    # El modelo se carga en la primera predicción, no al importar el módulo
+    global _modelo, _huella_modelo
+    if _modelo is None:
+        with _modelo_lock:
+            if _modelo is None:
+                _huella_modelo = _huella(model_path)
+                if CACHE_ETIQUETAS_DISCO and CACHE_ETIQUETAS_MAX:
+                    _leer_cache_disco()
+                _modelo = joblib.load(model_path, mmap_mode=MODEL_MMAP_MODE)
+    return _modelo
 
-    if "descripcion" not in datos.columns or "monto" not in datos.columns:
-        print(f"⚠️ Error: Las columnas no existen en datos: {datos.columns}")
-        return "Sin etiqueta"
 
-    datos['descripcion'] = datos['descripcion'].astype(str)
-    datos['monto'] = datos['monto'].astype(str)
+def precargar_modelo():
+    # Carga el modelo y hace una predicción de prueba; conviene llamarlo antes de crear los pools de procesos
+    cargar_modelo().predict(["precarga 0.0"])
 
-    datos_procesados = datos['descripcion'] + " " + datos['monto']
-    return modelo.predict(datos_procesados)[0]
 
+def _normalizar(texto):
+    # El vectorizador ignora mayúsculas y espacios repetidos, así que la llave también
+    return " ".join(texto.lower().split())
+
+
+def predecir_etiquetas(descripciones, montos, cache=None):
+    # Etiqueta un lote completo con una sola llamada a modelo.predict, solo para lo que no está en caché.
+    # Si se pasa cache (dict), se acumulan ahí los "aciertos" y "fallos" de esta llamada
+    descripciones = pd.Series(descripciones, dtype=object).reset_index(drop=True)
+    montos = pd.Series(montos, dtype=object).reset_index(drop=True)
+
+    if len(descripciones) != len(montos):
+        raise ValueError(f"Se esperaban {len(descripciones)} montos, se recibieron {len(montos)}")
+
+    if descripciones.empty:
+        return []
+
+    datos_procesados = descripciones.astype(str) + " " + montos.astype(str)
+    modelo = cargar_modelo()
+    if not CACHE_ETIQUETAS_MAX:
+        return list(modelo.predict(datos_procesados))
+
+    llaves = [_normalizar(texto) for texto in datos_procesados]
+    # Una descripción repetida en el lote se busca y se cuenta una sola vez
+    unicas = list(dict.fromkeys(llaves))
+    etiquetas = {}
+    with _cache_lock:
+        for llave in unicas:
+            if llave in _cache:
+                _cache.move_to_end(llave)
+                etiquetas[llave] = _cache[llave]
+
+    faltantes = [llave for llave in unicas if llave not in etiquetas]
+    if faltantes:
+        etiquetas.update(zip(faltantes, modelo.predict(faltantes)))
+
+    with _cache_lock:
+        for llave in faltantes:
+            _cache[llave] = etiquetas[llave]
+            if CACHE_ETIQUETAS_DISCO:
+                _pendientes_disco[llave] = etiquetas[llave]
+        while len(_cache) > CACHE_ETIQUETAS_MAX:
+            _cache.popitem(last=False)
+
+    if cache is not None:
+        cache["aciertos"] = cache.get("aciertos", 0) + len(unicas) - len(faltantes)
+        cache["fallos"] = cache.get("fallos", 0) + len(faltantes)
+
+    if faltantes and CACHE_ETIQUETAS_DISCO:
+        _guardar_cache_disco()
+
+    return [etiquetas[llave] for llave in llaves]
+
+
+def predecir_etiqueta(descripcion, monto):
+    return predecir_etiquetas([descripcion], [monto])[0]
@@ -0,0 +1,192 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from concurrent.futures.process import BrokenProcessPool
+import pdfplumber
+from almacen import podar_carpeta, tocar
+from procesos import PoolDeProcesos
+
+CACHE_FOLDER = os.environ.get("TEXT_CACHE_FOLDER", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "texto"))
+TEXT_CACHE_MAX_MB = int(os.environ.get("TEXT_CACHE_MAX_MB", 512))
+TEXT_CACHE_TTL_DIAS = int(os.environ.get("TEXT_CACHE_TTL_DIAS", 30))
+PAGINAS_MIN_PARALELO = 8
+CHUNK_SIZE = 1024 * 1024
+# Un PDF subido de hasta este tamaño se procesa desde memoria; uno mayor se copia a la carpeta del trabajo
+# mientras se lee, para que la memoria por carga no dependa solo de MAX_UPLOAD_MB
+PDF_MAX_MEMORIA_MB = int(os.environ.get("PDF_MAX_MEMORIA_MB", 16))
+
+# Pool de procesos para las páginas de un PDF grande; se reutiliza entre llamadas, aparte del de pipeline
+_pool = PoolDeProcesos()
+
+# Un documento es {"nombre", "fuente", "hash", "bytes"}: fuente es la ruta del PDF o su contenido en memoria,
+# y todas las funciones que reciben filepath aceptan cualquiera de las dos
+
+
+def documento_desde_stream(nombre, stream, carpeta=None, chunk_size=CHUNK_SIZE):
+    # Una sola lectura del archivo subido: se calcula el SHA-256 mientras se copia a memoria o,
+    # si pasa de PDF_MAX_MEMORIA_MB y hay carpeta, a carpeta/nombre
+    sha = hashlib.sha256()
+    partes = []
+    tamano = 0
+    destino = None
+    archivo = None
+    try:
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            sha.update(chunk)
+            tamano += len(chunk)
+            if archivo is None and carpeta and tamano > PDF_MAX_MEMORIA_MB * 1024 * 1024:
+                destino = os.path.join(carpeta, nombre)
+                archivo = open(f"{destino}.tmp", "wb")
+                archivo.writelines(partes)
+                partes = []
+            if archivo is None:
+                partes.append(chunk)
+            else:
+                archivo.write(chunk)
+    except Exception:
+        if archivo is not None:
+            archivo.close()
+            os.remove(f"{destino}.tmp")
+        raise
+
+    if archivo is None:
+        fuente = b"".join(partes)
+    else:
+        archivo.close()
+        os.replace(f"{destino}.tmp", destino)
+        fuente = destino
+    return {"nombre": nombre, "fuente": fuente, "hash": sha.hexdigest(), "bytes": tamano}
+
+
+def abrir_pdf(filepath):
+    if isinstance(filepath, bytes):
+        return pdfplumber.open(io.BytesIO(filepath))
+    return pdfplumber.open(filepath)
+
+
+def hash_archivo(filepath, chunk_size=CHUNK_SIZE):
+    if isinstance(filepath, bytes):
+        return hashlib.sha256(filepath).hexdigest()
+    sha = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _cache_dir(digest):
+    return os.path.join(CACHE_FOLDER, digest)
+
+
+def _escribir_atomico(path, contenido):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(contenido)
+    os.replace(tmp_path, path)
+
+
+def _leer_cache(digest):
+    # Devuelve (num_paginas, {indice: texto}) con lo que haya en disco
+    meta_path = os.path.join(_cache_dir(digest), "paginas.json")
+    if not os.path.exists(meta_path):
+        return None, {}
+
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            num_paginas = json.load(f)["paginas"]
+    except FileNotFoundError:
+        # La poda la borró entre la verificación y la lectura
+        return None, {}
+    tocar(_cache_dir(digest))
+
+    textos = {}
+    for i in range(num_paginas):
+        page_path = os.path.join(_cache_dir(digest), f"{i}.txt")
+        try:
+            with open(page_path, encoding="utf-8") as f:
+                textos[i] = f.read()
+        except FileNotFoundError:
+            # Nunca se guardó o la poda la borró: la página se vuelve a extraer
+            continue
+    return num_paginas, textos
+
+
+def _guardar_cache(digest, num_paginas, textos):
+    cache_dir = _cache_dir(digest)
+    os.makedirs(cache_dir, exist_ok=True)
+    for i, texto in textos.items():
+        _escribir_atomico(os.path.join(cache_dir, f"{i}.txt"), texto)
+    _escribir_atomico(os.path.join(cache_dir, "paginas.json"), json.dumps({"paginas": num_paginas}))
+    podar_carpeta(CACHE_FOLDER, TEXT_CACHE_MAX_MB, TEXT_CACHE_TTL_DIAS)
+
+
+def _extraer_rango(filepath, indices):
+    # Abre el PDF una sola vez y llama extract_text() una sola vez por página;
+    # devuelve también cuánto tardó pdfplumber.open
+    inicio = time.perf_counter()
+    with abrir_pdf(filepath) as pdf:
+        apertura = time.perf_counter() - inicio
+        return {i: pdf.pages[i].extract_text() or "" for i in indices}, apertura
+
+
+def _contar_paginas(filepath):
+    inicio = time.perf_counter()
+    with abrir_pdf(filepath) as pdf:
+        return len(pdf.pages), time.perf_counter() - inicio
+
+
+def extraer_paginas(filepath, workers=1, usar_cache=True, digest=None, tiempos=None):
+    # Si se pasa tiempos (dict), se acumulan ahí "apertura" y "texto" en segundos
+    inicio = time.perf_counter()
+    apertura = 0.0
+    if usar_cache and digest is None:
+        digest = hash_archivo(filepath)
+    num_paginas, textos = _leer_cache(digest) if usar_cache else (None, {})
+
+    if num_paginas is None:
+        num_paginas, apertura = _contar_paginas(filepath)
+
+    faltantes = [i for i in range(num_paginas) if i not in textos]
+    if faltantes:
+        # El pool conserva el tamaño configurado; solo el número de bloques depende del PDF
+        procesos = max(1, workers)
+        workers = max(1, min(workers, len(faltantes)))
+        if workers == 1 or len(faltantes) < PAGINAS_MIN_PARALELO:
+            nuevos, segundos = _extraer_rango(filepath, faltantes)
+            apertura += segundos
+        else:
+            # Cada proceso recibe un bloque contiguo de páginas
+            size = -(-len(faltantes) // workers)
+            bloques = [faltantes[i:i + size] for i in range(0, len(faltantes), size)]
+            nuevos = {}
+            # Un PDF en memoria se escribe una vez a un archivo temporal: cada bloque recibe la ruta
+            # en lugar de una copia completa de los bytes
+            temporal = None
+            if isinstance(filepath, bytes):
+                with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+                    f.write(filepath)
+                    temporal = f.name
+            try:
+                executor = _pool.obtener(procesos)
+                for parcial, segundos in executor.map(_extraer_rango, [temporal or filepath] * len(bloques), bloques):
+                    nuevos.update(parcial)
+                    apertura += segundos
+            except BrokenProcessPool:
+                _pool.reiniciar()
+                raise
+            finally:
+                if temporal:
+                    os.remove(temporal)
+
+        textos.update(nuevos)
+        if usar_cache:
+            _guardar_cache(digest, num_paginas, nuevos)
+
+    if tiempos is not None:
+        tiempos["apertura"] = tiempos.get("apertura", 0.0) + apertura
+        tiempos["texto"] = tiempos.get("texto", 0.0) + max(0.0, time.perf_counter() - inicio - apertura)
+    return [textos[i] for i in range(num_paginas)]
+
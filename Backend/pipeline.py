@@ -0,0 +1,110 @@
+import logging
+import time
+import pandas as pd
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from bancos import detectar_banco
+from model import predecir_etiquetas
+from pdf_text import extraer_paginas, hash_archivo
+from almacen import buscar_resultado
+from layout import extract_layout, usa_layout
+from procesos import PoolDeProcesos
+
+logger = logging.getLogger(__name__)
+
+_pool = PoolDeProcesos()
+
+
+def procesar_pdf(documento, page_workers=1):
+    # Se ejecuta dentro de un proceso del pool: extrae, detecta el banco y etiqueta.
+    # documento viene de pdf_text.documento_desde_stream
+    tiempos = {}
+    filepath = documento["fuente"]
+    inicio = time.perf_counter()
+    # Los archivos subidos ya traen el hash calculado al recibirlos
+    digest = documento["hash"] or hash_archivo(filepath)
+    bank, data = buscar_resultado(digest)
+    tiempos["hash"] = time.perf_counter() - inicio
+    if bank is not None:
+        logger.info("♻️ %s ya fue procesado, se reutiliza el resultado", documento["nombre"])
+        return {"hash": digest, "banco": bank, "data": data, "duplicado": True, "tiempos": tiempos}
+
+    paginas = extraer_paginas(filepath, workers=page_workers, digest=digest, tiempos=tiempos)
+    full_text = "\n".join(texto for texto in paginas if texto)
+
+    logger.debug("📄 Texto extraído del PDF:\n%s", full_text[:1000])
+
+    inicio = time.perf_counter()
+    banco = detectar_banco(paginas)
+    tiempos["deteccion"] = time.perf_counter() - inicio
+    if banco is None:
+        raise ValueError(f"Banco no reconocido en {documento['nombre']}")
+
+    inicio = time.perf_counter()
+    bank = banco["nombre"]
+    if usa_layout(bank):
+        logger.info("📐 Extrayendo %s por coordenadas de columna", bank)
+        data = extract_layout(filepath, bank)
+    else:
+        data = banco["extractor"](full_text)
+    tiempos["extraccion"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    # Aciertos y fallos de esta llamada: los contadores globales del proceso los comparten trabajos simultáneos
+    cache_etiquetas = {"aciertos": 0, "fallos": 0}
+    if not data.empty:
+        if "descripcion" not in data.columns or "monto" not in data.columns:
+            logger.warning("⚠️ Error: No existen las columnas esperadas en data: %s", data.columns)
+        else:
+            # Pocas etiquetas distintas repetidas en cada fila: categórica
+            data["etiqueta"] = pd.Categorical(predecir_etiquetas(data["descripcion"], data["monto"], cache=cache_etiquetas))
+    tiempos["etiquetado"] = time.perf_counter() - inicio
+
+    return {"hash": digest, "banco": bank, "data": data, "duplicado": False, "tiempos": tiempos, "cache_etiquetas": cache_etiquetas}
+
+
+def _resultado_con_error(documento, error):
+    logger.warning("⚠️ Error procesando %s: %s", documento["nombre"], error)
+    return {"archivo": documento["nombre"], "bytes": documento["bytes"], "hash": None, "banco": None, "data": None,
+            "duplicado": False, "tiempos": {}, "error": str(error)}
+
+
+def _resultado(documento, resultado):
+    return {"archivo": documento["nombre"], "bytes": documento["bytes"], "error": None, **resultado}
+
+
+def procesar_pdfs(documentos, workers=1, page_workers=1, al_terminar=None):
+    # Devuelve un resultado por documento, en el mismo orden en que se recibieron;
+    # al_terminar(indice, resultado) se llama conforme termina cada archivo
+    resultados = [None] * len(documentos)
+
+    def _terminar(i, resultado):
+        resultados[i] = resultado
+        if al_terminar is not None:
+            al_terminar(i, resultado)
+
+    if workers <= 1 or len(documentos) <= 1:
+        for i, documento in enumerate(documentos):
+            try:
+                resultado = _resultado(documento, procesar_pdf(documento, page_workers))
+            except Exception as e:
+                resultado = _resultado_con_error(documento, e)
+            _terminar(i, resultado)
+        return resultados
+
+    # Con varios archivos el paralelismo es por archivo; cada uno se lee con un solo proceso
+    executor = _pool.obtener(workers)
+    futures = {executor.submit(procesar_pdf, documento): i for i, documento in enumerate(documentos)}
+
+    for future in as_completed(futures):
+        i = futures[future]
+        try:
+            resultado = _resultado(documentos[i], future.result())
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # Un proceso murió: se descarta el pool para que el siguiente lote cree uno nuevo
+                _pool.reiniciar()
+            resultado = _resultado_con_error(documentos[i], e)
+        _terminar(i, resultado)
+
+    return resultados
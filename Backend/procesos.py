@@ -0,0 +1,27 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+class PoolDeProcesos:
+    # Un ProcessPoolExecutor que se crea una vez y se reutiliza entre llamadas; solo se vuelve a crear
+    # si cambia el número de procesos o si reiniciar() lo descarta tras un BrokenProcessPool
+
+    def __init__(self):
+        self._executor = None
+        self._workers = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, workers):
+        with self._lock:
+            if self._executor is None or self._workers != workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ProcessPoolExecutor(max_workers=workers)
+                self._workers = workers
+            return self._executor
+
+    def reiniciar(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
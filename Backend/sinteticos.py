@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+# Movimientos sintéticos reproducibles para las pruebas y los benchmarks contra la base de prueba
+
+
+def movimientos_sinteticos(filas, seed=42):
+    rng = np.random.default_rng(seed)
+    bancos = np.array(["BBVA", "Banorte", "Santander", "Banamex", "Inbursa", "Banco Azteca", "Banregio"])
+    descripciones = np.array(["SPEI RECIBIDO BANORTE", "CARGO COBRANZA FACILEASIN", "PAGO TARJETA DE CREDITO",
+                              "DEPOSITO EN EFECTIVO", "COMISION MANEJO DE CUENTA", "TRASPASO A TERCEROS"])
+    etiquetas = np.array(["Deposito", "Retiro"])
+    fechas = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, filas), unit="D")
+    return pd.DataFrame({
+        "banco": bancos[rng.integers(0, len(bancos), filas)],
+        "fecha_operacion": fechas.strftime("%Y-%m-%d"),
+        "descripcion": descripciones[rng.integers(0, len(descripciones), filas)] + " " + rng.integers(0, 10**6, filas).astype(str),
+        "referencia": None,
+        "monto": rng.integers(100, 10**7, filas) / 100,
+        "saldo_operacion": rng.integers(100, 10**8, filas) / 100,
+        "etiqueta": etiquetas[rng.integers(0, len(etiquetas), filas)]
+    })
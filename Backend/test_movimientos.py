@@ -0,0 +1,157 @@
+import functools
+import unittest
+from unittest import mock
+import pandas as pd
+import db
+from sinteticos import movimientos_sinteticos
+
+# Paginación de /movements contra SQLite como sustituto local de MySQL (db._sql traduce las consultas).
+# Ejecutar desde Backend/: python -m pytest -q test_movimientos.py  (o python -m unittest test_movimientos)
+
+
+def _recorrer(conn, limite, max_paginas=1000, **filtros):
+    # Sigue el cursor hasta la última página; devuelve los ids en el orden en que se entregaron.
+    # Un cursor que no avanza fallaría al agotar max_paginas en lugar de repetir la misma página para siempre
+    ids = []
+    siguiente = None
+    for _ in range(max_paginas):
+        filas, siguiente = db.consultar_movimientos(despues=siguiente, limite=limite, conn=conn, **filtros)
+        assert len(filas) <= limite
+        ids.extend(fila["id"] for fila in filas)
+        if siguiente is None:
+            return ids
+    raise AssertionError(f"El cursor no llegó a la última página en {max_paginas} páginas")
+
+
+class ConsultarMovimientosTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = db.conexion_sqlite()
+        # 600 movimientos en 365 días: casi todas las fechas se repiten, también entre páginas
+        data = movimientos_sinteticos(600)
+        # Un día con muchas filas iguales en fecha para que el empate caiga a la mitad de varias páginas
+        data.loc[:39, "fecha_operacion"] = "2024-05-15"
+        db.insert_data(data, conn=cls.conn)
+        cls.tabla = pd.read_sql_query("SELECT id, banco, fecha_operacion, etiqueta FROM movimientos", cls.conn)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def _esperados(self, banco=None, etiqueta=None, desde=None, hasta=None):
+        tabla = self.tabla
+        if banco is not None:
+            tabla = tabla[tabla["banco"] == banco]
+        if etiqueta is not None:
+            tabla = tabla[tabla["etiqueta"] == etiqueta]
+        if desde is not None:
+            tabla = tabla[tabla["fecha_operacion"] >= desde]
+        if hasta is not None:
+            tabla = tabla[tabla["fecha_operacion"] <= hasta]
+        return tabla.sort_values(["fecha_operacion", "id"])["id"].tolist()
+
+    def test_recorrido_completo_sin_duplicados_ni_huecos(self):
+        self.assertGreater((self.tabla["fecha_operacion"] == "2024-05-15").sum(), 7)
+        for limite in (1, 7, 100, 1000):
+            ids = _recorrer(self.conn, limite, max_paginas=len(self.tabla) + 1)
+            self.assertEqual(len(ids), len(set(ids)))
+            self.assertEqual(ids, self._esperados())
+
+    def test_ultima_pagina_exacta_no_tiene_siguiente(self):
+        filas, siguiente = db.consultar_movimientos(limite=len(self.tabla), conn=self.conn)
+        self.assertEqual(len(filas), len(self.tabla))
+        self.assertIsNone(siguiente)
+
+    def test_filtros(self):
+        casos = [
+            {"banco": "Banorte"},
+            {"etiqueta": "Retiro"},
+            {"desde": "2024-03-01", "hasta": "2024-03-31"},
+            {"banco": "Santander", "etiqueta": "Deposito", "desde": "2024-04-01", "hasta": "2024-06-30"},
+            {"banco": "No existe"},
+        ]
+        for filtros in casos:
+            with self.subTest(**filtros):
+                ids = _recorrer(self.conn, 9, **filtros)
+                self.assertEqual(ids, self._esperados(**filtros))
+                if filtros.get("banco") != "No existe":
+                    self.assertTrue(ids)
+
+    def test_cursor_invalido(self):
+        for cursor in ("abc", "2024-05-15", "2024-13-01_5", "2024-05-15_x"):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValueError):
+                    db.consultar_movimientos(despues=cursor, conn=self.conn)
+
+
+class CalcularHashesTest(unittest.TestCase):
+
+    def test_filas_anteriores_a_la_migracion_no_se_vuelven_a_insertar(self):
+        conn = db.conexion_sqlite()
+        self.addCleanup(conn.close)
+        data = movimientos_sinteticos(50)
+        # Dos cargos idénticos en el mismo estado de cuenta siguen siendo dos movimientos
+        data = pd.concat([data, data.iloc[[3]]], ignore_index=True)
+        data.loc[7, "descripcion"] = None
+        db.insert_data(data, conn=conn)
+        originales = conn.execute("SELECT id, hash_movimiento FROM movimientos ORDER BY id").fetchall()
+        # Así quedaron las filas cargadas antes de la migración 002
+        conn.execute("UPDATE movimientos SET hash_movimiento = NULL")
+        conn.commit()
+
+        self.assertEqual(db.calcular_hashes(conn=conn, chunk_size=7), len(data))
+        self.assertEqual(conn.execute("SELECT id, hash_movimiento FROM movimientos ORDER BY id").fetchall(), originales)
+        self.assertEqual(db.insert_data(data, conn=conn), 0)
+        self.assertEqual(db.calcular_hashes(conn=conn), 0)
+
+
+class MovementsEndpointTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        import app
+        cls.conn = db.conexion_sqlite()
+        db.insert_data(movimientos_sinteticos(120), conn=cls.conn)
+        cls.cliente = app.app.test_client()
+        # La ruta consulta la base de prueba en lugar de abrir una conexión a MySQL
+        cls.parche = mock.patch.object(app, "consultar_movimientos", functools.partial(db.consultar_movimientos, conn=cls.conn))
+        cls.parche.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.parche.stop()
+        cls.conn.close()
+
+    def test_recorrido_por_cursor(self):
+        ids = []
+        parametros = {"banco": "Banorte", "limite": 5}
+        for _ in range(100):
+            respuesta = self.cliente.get("/movements", query_string=parametros)
+            self.assertEqual(respuesta.status_code, 200)
+            cuerpo = respuesta.get_json()
+            self.assertTrue(all(fila["banco"] == "Banorte" for fila in cuerpo["movimientos"]))
+            ids.extend(fila["id"] for fila in cuerpo["movimientos"])
+            if cuerpo["siguiente"] is None:
+                break
+            parametros["cursor"] = cuerpo["siguiente"]
+        else:
+            self.fail("El cursor no llegó a la última página")
+        esperados = db.consultar_movimientos(banco="Banorte", limite=1000, conn=self.conn)[0]
+        self.assertEqual(ids, [fila["id"] for fila in esperados])
+
+    def test_parametros_invalidos_responden_400(self):
+        for parametros in ({"cursor": "abc"}, {"cursor": "2024-05-15_x"}, {"desde": "2024-13-01"},
+                           {"hasta": "15/05/2024"}, {"limite": "diez"}, {"limite": "1.5"}):
+            with self.subTest(**parametros):
+                respuesta = self.cliente.get("/movements", query_string=parametros)
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn("error", respuesta.get_json())
+
+    def test_limite_fuera_de_rango_se_acota(self):
+        respuesta = self.cliente.get("/movements", query_string={"limite": 0})
+        self.assertEqual(len(respuesta.get_json()["movimientos"]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import re
+
+# Patrones compartidos por todos los extractores, compilados una sola vez al importar
+MESES = "ENE|FEB|MAR|ABR|MAY|JUN|JUL|AGO|SEP|OCT|NOV|DIC"
+MONTO = r"\d{1,3}(?:,\d{3})*\.\d{2}"
+MONTO_PESOS = r"\$" + MONTO
+
+MONTO_RE = re.compile(MONTO)
+
+
+def patron_linea(fecha, flags=0, monto=MONTO):
+    # Un regex por formato de banco con dos grupos: la fecha y los montos de la línea
+    return re.compile(f"(?P<fecha>{fecha})|(?P<monto>{monto})", flags)
+
+
+def tokenizar(linea, patron):
+    # Una sola pasada por la línea: devuelve las coincidencias de fecha y de monto en orden
+    fechas = []
+    montos = []
+    for match in patron.finditer(linea):
+        if match.lastgroup == "monto":
+            montos.append(match)
+        else:
+            fechas.append(match)
+    return fechas, montos
+
+
+def quitar_coincidencias(linea, matches):
+    # Recorta los fragmentos por posición en lugar de un replace por cada monto
+    partes = []
+    inicio = 0
+    for match in sorted(matches, key=lambda m: m.start()):
+        partes.append(linea[inicio:match.start()])
+        inicio = match.end()
+    partes.append(linea[inicio:])
+    return "".join(partes).strip()
+
+
+def montos_en_tokens(partes):
+    return [parte for parte in partes if MONTO_RE.match(parte)]
+
+
+def a_numero(texto):
+    return float(texto.replace(",", "").replace("$", ""))
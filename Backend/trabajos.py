@@ -0,0 +1,311 @@
+import contextlib
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from db import insert_data
+from pipeline import procesar_pdfs
+from almacen import guardar_resultado
+from exportar import abrir_libro, escribir_hoja
+import metricas
+
+logger = logging.getLogger(__name__)
+
+# Cada trabajo corre en un hilo de este pool; la extracción pesada la hace el pool de procesos de pipeline
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+# Los trabajos terminados se descartan al vencer su TTL o cuando sus resultados exceden el tope
+# (DataFrames en memoria o, con EXPORT_STREAMING, el .xlsx en disco)
+JOB_TTL = int(os.environ.get("JOB_TTL", 3600))
+JOB_MAX_MB = int(os.environ.get("JOB_MAX_MB", 512))
+# Con EXPORT_STREAMING=1 cada hoja del Excel se escribe en cuanto su estado de cuenta termina y el DataFrame
+# se libera; el trabajo solo guarda el .xlsx en su carpeta y los hashes para releer los resultados del almacén
+EXPORT_STREAMING = os.environ.get("EXPORT_STREAMING", "0") == "1"
+EXCEL_FILENAME = "movimientos_combinados.xlsx"
+# Los PDFs se procesan desde memoria; con GUARDAR_PDFS=1 además se copian a la carpeta del trabajo en segundo plano
+GUARDAR_PDFS = os.environ.get("GUARDAR_PDFS", "0") == "1"
+# Trabajos en cola o procesando a la vez: cada uno retiene en memoria sus PDFs de hasta PDF_MAX_MEMORIA_MB
+# hasta terminar, así que sin este tope la memoria crecería con las cargas en espera
+JOB_MAX_PENDIENTES = int(os.environ.get("JOB_MAX_PENDIENTES", 2 * JOB_WORKERS))
+
+TRABAJOS = {}
+# Aciertos y fallos de la caché de etiquetas sumados de todos los archivos procesados
+CACHE_ETIQUETAS = {"aciertos": 0, "fallos": 0}
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="trabajo")
+_persistencia = ThreadPoolExecutor(max_workers=1, thread_name_prefix="guardar_pdf")
+_cupos = threading.BoundedSemaphore(JOB_MAX_PENDIENTES)
+
+
+def nuevo_trabajo_id():
+    return uuid.uuid4().hex
+
+
+def reservar_cupo():
+    # Se llama antes de leer los archivos de la petición; False si ya hay JOB_MAX_PENDIENTES trabajos sin terminar
+    return _cupos.acquire(blocking=False)
+
+
+def liberar_cupo():
+    _cupos.release()
+
+
+def crear_trabajo(job_id, carpeta, documentos, workers=1, page_workers=1):
+    # carpeta es el directorio propio del trabajo (PDFs guardados, Excel en streaming); se borra junto con el trabajo.
+    # Requiere un cupo de reservar_cupo(), que se libera cuando el trabajo termina
+    trabajo = {
+        "id": job_id,
+        "estado": "en_cola",
+        "creado": time.time(),
+        "finalizado": None,
+        "carpeta": carpeta,
+        "archivos": [
+            {"archivo": documento["nombre"], "estado": "pendiente", "banco": None, "movimientos": 0, "tiempos": {},
+             "cache_etiquetas": {}, "error": None}
+            for documento in documentos
+        ],
+        "tiempos": {},
+        "movimientos": None,
+        "excel": None,
+        "bytes": 0,
+        "en_uso": 0,
+        "error": None,
+        # Se activa al terminar, con o sin error; lo usan las cargas síncronas de esperar_trabajo
+        "listo": threading.Event(),
+    }
+    with _lock:
+        TRABAJOS[job_id] = trabajo
+    _evictar()
+    if GUARDAR_PDFS:
+        for documento in documentos:
+            _persistencia.submit(_guardar_pdf, job_id, carpeta, documento)
+    _executor.submit(_ejecutar_con_cupo, trabajo, documentos, workers, page_workers)
+    return job_id
+
+
+def _vigente(job_id):
+    with _lock:
+        return job_id in TRABAJOS
+
+
+def _guardar_pdf(job_id, carpeta, documento):
+    # Fuera de la petición y del procesamiento: nadie espera a que el PDF original llegue a disco.
+    # Si el trabajo ya se descartó no se vuelve a crear su carpeta. Un PDF grande ya está en la carpeta
+    if not _vigente(job_id) or not isinstance(documento["fuente"], bytes):
+        return
+    try:
+        os.makedirs(carpeta, exist_ok=True)
+        filepath = os.path.join(carpeta, documento["nombre"])
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(documento["fuente"])
+        os.replace(tmp_path, filepath)
+    except Exception as e:
+        logger.warning("⚠️ No se pudo guardar %s: %s", documento["nombre"], e)
+    # Descartado mientras se escribía: _evictar ya borró la carpeta o la está borrando
+    if not _vigente(job_id):
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+def obtener_trabajo(job_id):
+    _evictar()
+    with _lock:
+        return TRABAJOS.get(job_id)
+
+
+@contextlib.contextmanager
+def trabajo_en_uso(trabajo):
+    # Mientras dura, _evictar no descarta el trabajo ni borra su carpeta. Entrega False si ya se había descartado
+    with _lock:
+        vigente = TRABAJOS.get(trabajo["id"]) is trabajo
+        if vigente:
+            trabajo["en_uso"] += 1
+    try:
+        yield vigente
+    finally:
+        if vigente:
+            with _lock:
+                trabajo["en_uso"] -= 1
+
+
+def esperar_trabajo(trabajo, timeout=None):
+    # Bloquea hasta que el trabajo termine; False si se agotó el timeout
+    return trabajo["listo"].wait(timeout)
+
+
+def _evictar():
+    ahora = time.time()
+    descartados = []
+    with _lock:
+        terminados = sorted(
+            (trabajo for trabajo in TRABAJOS.values() if trabajo["finalizado"] is not None),
+            key=lambda trabajo: trabajo["finalizado"]
+        )
+        total = sum(trabajo["bytes"] for trabajo in terminados)
+        for trabajo in terminados:
+            # Un trabajo en uso (generando o abriendo su Excel) se descarta en una llamada posterior
+            if trabajo["en_uso"]:
+                continue
+            # Primero los vencidos; luego los más antiguos hasta quedar bajo el tope
+            if ahora - trabajo["finalizado"] > JOB_TTL or total > JOB_MAX_MB * 1024 * 1024:
+                total -= trabajo["bytes"]
+                descartados.append(TRABAJOS.pop(trabajo["id"]))
+
+    for trabajo in descartados:
+        logger.info("🗑️ Trabajo %s descartado", trabajo["id"])
+        shutil.rmtree(trabajo["carpeta"], ignore_errors=True)
+
+
+def estado_trabajo(trabajo):
+    # Vista serializable del trabajo (sin los DataFrames)
+    with _lock:
+        return {
+            "job_id": trabajo["id"],
+            "estado": trabajo["estado"],
+            "archivos": [dict(archivo, tiempos=dict(archivo["tiempos"])) for archivo in trabajo["archivos"]],
+            "procesados": sum(archivo["estado"] in ("terminado", "error") for archivo in trabajo["archivos"]),
+            "total": len(trabajo["archivos"]),
+            "tiempos": dict(trabajo["tiempos"]),
+            "error": trabajo["error"],
+        }
+
+
+def _actualizar(trabajo, **cambios):
+    with _lock:
+        trabajo.update(cambios)
+
+
+def _actualizar_archivo(trabajo, i, **cambios):
+    with _lock:
+        trabajo["archivos"][i].update(cambios)
+
+
+def _sumar_cache_etiquetas(cache_etiquetas):
+    if not cache_etiquetas:
+        return
+    with _lock:
+        for clave, valor in cache_etiquetas.items():
+            CACHE_ETIQUETAS[clave] += valor
+    for clave, valor in cache_etiquetas.items():
+        metricas.incrementar("cache_etiquetas_total", valor, resultado=clave)
+
+
+def estadisticas_cache_etiquetas():
+    with _lock:
+        total = CACHE_ETIQUETAS["aciertos"] + CACHE_ETIQUETAS["fallos"]
+        return {**CACHE_ETIQUETAS, "tasa_aciertos": CACHE_ETIQUETAS["aciertos"] / total if total else 0.0}
+
+
+def _ejecutar_con_cupo(trabajo, documentos, workers, page_workers):
+    try:
+        _ejecutar(trabajo, documentos, workers, page_workers)
+    finally:
+        liberar_cupo()
+        trabajo["listo"].set()
+
+
+def _ejecutar(trabajo, documentos, workers, page_workers):
+    inicio = time.perf_counter()
+    _actualizar(trabajo, estado="procesando")
+    movimientos = {}
+    excel_path = os.path.abspath(os.path.join(trabajo["carpeta"], EXCEL_FILENAME)) if EXPORT_STREAMING else None
+    libro = None
+    # Resultados que llegaron antes que los de archivos anteriores; las hojas se escriben en el orden de subida
+    pendientes = {}
+    siguiente = 0
+
+    def guardar(i, result):
+        # Inserta el resultado y actualiza el estado del archivo; devuelve sus movimientos o None si falló
+        filename = result["archivo"]
+        if result["error"]:
+            metricas.incrementar("archivos_total", estado="error")
+            _actualizar_archivo(trabajo, i, estado="error", error=result["error"])
+            return None
+
+        _actualizar_archivo(trabajo, i, estado="guardando", banco=result["banco"], tiempos=result["tiempos"],
+                            cache_etiquetas=result.get("cache_etiquetas", {}))
+        _sumar_cache_etiquetas(result.get("cache_etiquetas"))
+        data = result["data"]
+        try:
+            if not result["duplicado"]:
+                inicio_insercion = time.perf_counter()
+                insert_data(data)
+                guardar_resultado(result["hash"], result["banco"], data)
+                result["tiempos"]["insercion"] = time.perf_counter() - inicio_insercion
+        except Exception as e:
+            logger.warning("⚠️ Error guardando %s: %s", filename, e)
+            metricas.incrementar("archivos_total", estado="error")
+            _actualizar_archivo(trabajo, i, estado="error", error=str(e))
+            return None
+
+        # Los tiempos del pool de procesos se registran aquí, etiquetados por banco y tamaño del PDF
+        tamano = metricas.tamano_archivo(result["bytes"])
+        metricas.observar_tiempos(result["tiempos"], banco=result["banco"], tamano=tamano)
+        metricas.incrementar("archivos_total", estado="duplicado" if result["duplicado"] else "procesado")
+        metricas.incrementar("movimientos_total", len(data), banco=result["banco"])
+        _actualizar_archivo(trabajo, i, estado="terminado", movimientos=len(data))
+        return data
+
+    def escribir_pendientes():
+        nonlocal siguiente
+        while siguiente in pendientes:
+            listo = pendientes.pop(siguiente)
+            if listo is not None:
+                hoja, digest, data = listo
+                try:
+                    with metricas.medir("exportacion", formato="excel"):
+                        escribir_hoja(libro, hoja, data)
+                    movimientos[hoja] = digest
+                except Exception as e:
+                    logger.warning("⚠️ Error escribiendo la hoja %s: %s", hoja, e)
+                    _actualizar_archivo(trabajo, siguiente, estado="error", error=str(e))
+            siguiente += 1
+
+    def al_terminar(i, result):
+        data = guardar(i, result)
+        hoja = result["archivo"].replace(".pdf", "")
+        if libro is None:
+            if data is not None and not data.empty:
+                movimientos[hoja] = data
+            return
+        # En modo streaming el DataFrame solo vive hasta que se escribe su hoja
+        pendientes[i] = (hoja, result["hash"], data) if data is not None and not data.empty else None
+        escribir_pendientes()
+
+    try:
+        # Abrir y cerrar el libro también van aquí: si el Excel no se puede escribir (disco lleno, permisos)
+        # el trabajo termina en error en lugar de quedarse "procesando"
+        if EXPORT_STREAMING:
+            libro = abrir_libro(excel_path)
+        procesar_pdfs(documentos, workers, page_workers, al_terminar=al_terminar)
+        if libro is not None:
+            libro.close()
+    except Exception as e:
+        logger.error("⚠️ Error en el trabajo %s: %s", trabajo["id"], e)
+        if libro is not None and not libro.fileclosed:
+            try:
+                libro.close()
+            except Exception as error_cierre:
+                logger.warning("⚠️ No se pudo cerrar el Excel del trabajo %s: %s", trabajo["id"], error_cierre)
+        _actualizar(trabajo, estado="error", error=str(e), finalizado=time.time(), tiempos={"total": time.perf_counter() - inicio})
+        return
+
+    # Las hojas conservan el orden en que se subieron los archivos
+    orden = [documento["nombre"].replace(".pdf", "") for documento in documentos]
+    movimientos = {hoja: movimientos[hoja] for hoja in orden if hoja in movimientos}
+
+    if movimientos and libro is not None:
+        # Solo hashes en memoria: el Excel ya está en disco y CSV/TXT se releen del almacén.
+        # Su tamaño cuenta para JOB_MAX_MB igual que los DataFrames de los trabajos sin streaming
+        _actualizar(trabajo, estado="terminado", movimientos=movimientos, excel=excel_path,
+                    bytes=os.path.getsize(excel_path),
+                    finalizado=time.time(), tiempos={"total": time.perf_counter() - inicio})
+    elif movimientos:
+        bytes_resultado = int(sum(df.memory_usage(deep=True).sum() for df in movimientos.values()))
+        _actualizar(trabajo, estado="terminado", movimientos=movimientos, bytes=bytes_resultado,
+                    finalizado=time.time(), tiempos={"total": time.perf_counter() - inicio})
+    else:
+        _actualizar(trabajo, estado="error", error="No se extrajeron movimientos de los archivos",
+                    finalizado=time.time(), tiempos={"total": time.perf_counter() - inicio})
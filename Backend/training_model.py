@@ -1,10 +1,19 @@
+import argparse
+import glob
+import json
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
+from sklearn.linear_model import SGDClassifier
+from sklearn.svm import LinearSVC
 from sklearn.pipeline import make_pipeline
+from datetime import datetime
 import joblib
+import numpy as np
 import os
+import scipy.sparse as sp
+import time
 
 # Seleccionar los archivos CSV a cargar
 csv_folder = "CSV"
@@ -13,49 +22,301 @@ csv_files = [
     os.path.join(csv_folder, "movimientos_centralizados_02_25.csv")
 ]
 
-data_frames = [pd.read_csv(file) for file in csv_files]
-data = pd.concat(data_frames, ignore_index=True)
+accuracy_file = "accuracy_history.txt"
 
-# Rellenar valores nulos
-data['descripcion'] = data['descripcion'].fillna('')
-data['referencia'] = data['referencia'].fillna('N/A').astype(str)
-data['saldo_operacion'] = data['saldo_operacion'].fillna(0.0).astype(float)
+# Cada entrenamiento guarda su propio artefacto en modelos/ y una entrada en el historial
+MODELOS_FOLDER = "modelos"
+HISTORIAL_FILE = os.path.join(MODELOS_FOLDER, "historial.json")
+MODELO_INCREMENTAL = "modelo_movimientos_incremental.pkl"
+CHUNK_SIZE = 5000
 
-# Seleccionar características relevantes
-X = data['descripcion'] + " " + data['monto'].astype(str)  # Combinar descripción con monto
-y = data['etiqueta']  # La etiqueta a predecir
 
-# Dividir datos en entrenamiento y prueba
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def preparar_texto(data):
+    # Combinar descripción con monto, igual que model.predecir_etiquetas. El monto se pasa a float: desde MySQL
+    # llega como Decimal ("4060.00") y al servir los extractores entregan float64 ("4060.0")
+    monto = pd.to_numeric(data['monto'], errors="coerce").astype(float)
+    return data['descripcion'].fillna('').astype(str) + " " + monto.astype(str).where(monto.notna(), '')
 
-# Crear un modelo que use NLP (TF-IDF) + Random Forest
-model = make_pipeline(TfidfVectorizer(max_features=500), RandomForestClassifier(random_state=42))
 
-# Entrenar el modelo
-model.fit(X_train, y_train)
+def leer_historial():
+    if not os.path.exists(HISTORIAL_FILE):
+        return []
+    with open(HISTORIAL_FILE, encoding="utf-8") as f:
+        return json.load(f)
 
-# Evaluar el modelo
-accuracy = model.score(X_test, y_test)
 
-# Leer la precisión anterior si existe
-accuracy_file = "accuracy_history.txt"
-previous_accuracy = None
-if os.path.exists(accuracy_file):
-    with open(accuracy_file, "r") as f:
-        previous_accuracy = float(f.read().strip())
-
-# Mostrar comparación con precisión anterior
-if previous_accuracy is not None:
-    change = accuracy * 100 - previous_accuracy
-    status = "🔼 Mejoró" if change > 0 else "🔽 Empeoró"
-    print(f"🎯 Precisión del modelo: {accuracy * 100:.2f}% ({status} {abs(change):.2f}%)")
-else:
-    print(f"🎯 Precisión del modelo: {accuracy * 100:.2f}% (Primera ejecución)")
-
-# Guardar la nueva precisión
-with open(accuracy_file, "w") as f:
-    f.write(f"{accuracy * 100:.2f}")
-
-# Guardar el modelo entrenado
-joblib.dump(model, 'modelo_movimientos.pkl')
-print("✅ Modelo guardado como 'modelo_movimientos.pkl'")
+def precision_anterior(modo):
+    # Última precisión registrada para el modo; la primera vez se usa accuracy_history.txt
+    anteriores = [entrada for entrada in leer_historial() if entrada["modo"] == modo]
+    if anteriores:
+        return anteriores[-1]["precision"] * 100
+    if modo == "completo" and os.path.exists(accuracy_file):
+        with open(accuracy_file, "r") as f:
+            return float(f.read().strip())
+    return None
+
+
+def mostrar_precision(accuracy, previous_accuracy):
+    # Mostrar comparación con precisión anterior
+    if previous_accuracy is not None:
+        change = accuracy * 100 - previous_accuracy
+        status = "🔼 Mejoró" if change > 0 else "🔽 Empeoró"
+        print(f"🎯 Precisión del modelo: {accuracy * 100:.2f}% ({status} {abs(change):.2f}%)")
+    else:
+        print(f"🎯 Precisión del modelo: {accuracy * 100:.2f}% (Primera ejecución)")
+
+
+def guardar_modelo(modelo, path):
+    # Archivo temporal + os.replace: un servidor que tenga el .pkl anterior mapeado en memoria (MODEL_MMAP_MODE)
+    # conserva el inodo viejo intacto en lugar de ver cómo se reescribe debajo
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(modelo, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def guardar_version(modelo, modo, accuracy, segundos, filas, **extra):
+    # Artefacto versionado + entrada en modelos/historial.json con precisión y tiempo de entrenamiento
+    os.makedirs(MODELOS_FOLDER, exist_ok=True)
+    version = datetime.now().strftime("%Y%m%d_%H%M%S")
+    artefacto = os.path.join(MODELOS_FOLDER, f"modelo_{modo}_{version}.pkl")
+    guardar_modelo(modelo, artefacto)
+
+    historial = leer_historial()
+    historial.append({
+        "version": version,
+        "modo": modo,
+        "artefacto": artefacto,
+        "precision": accuracy,
+        "segundos_entrenamiento": segundos,
+        "filas": filas,
+        **extra
+    })
+    tmp_path = f"{HISTORIAL_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(historial, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, HISTORIAL_FILE)
+    print(f"🗂️ Versión {version} guardada en {artefacto}")
+    return artefacto
+
+
+def medir_latencia(modelo, X, filas=200):
+    # p50/p99 de predicciones de una sola fila y tiempo de una predicción por lote
+    latencias = []
+    for texto in X.iloc[:filas]:
+        inicio = time.perf_counter()
+        modelo.predict([texto])
+        latencias.append(time.perf_counter() - inicio)
+    inicio = time.perf_counter()
+    modelo.predict(X)
+    lote = time.perf_counter() - inicio
+    return np.percentile(latencias, 50) * 1000, np.percentile(latencias, 99) * 1000, lote * 1000
+
+
+def entrenar_completo(args):
+    data_frames = [pd.read_csv(file) for file in args.csv]
+    data = pd.concat(data_frames, ignore_index=True)
+
+    # Seleccionar características relevantes
+    X = preparar_texto(data)
+    y = data['etiqueta']  # La etiqueta a predecir
+
+    # Dividir datos en entrenamiento y prueba
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # Crear un modelo que use NLP (TF-IDF) + Random Forest
+    model = make_pipeline(TfidfVectorizer(max_features=500), RandomForestClassifier(random_state=42, n_jobs=args.n_jobs))
+
+    # Entrenar el modelo
+    inicio = time.perf_counter()
+    model.fit(X_train, y_train)
+    segundos = time.perf_counter() - inicio
+
+    # n_jobs solo es para entrenar: guardado en el .pkl, cada predict dentro del pool de procesos de
+    # pipeline abriría hilos en todos los núcleos
+    model.set_params(randomforestclassifier__n_jobs=None)
+
+    # Evaluar el modelo
+    accuracy = model.score(X_test, y_test)
+    mostrar_precision(accuracy, precision_anterior("completo"))
+
+    # Guardar la nueva precisión
+    with open(accuracy_file, "w") as f:
+        f.write(f"{accuracy * 100:.2f}")
+    guardar_version(model, "completo", accuracy, segundos, len(data))
+
+    # Guardar el modelo entrenado
+    guardar_modelo(model, 'modelo_movimientos.pkl')
+    print("✅ Modelo guardado como 'modelo_movimientos.pkl'")
+
+    # Modelo compacto para inferencia: texto con hashing (sin vocabulario que guardar) + un clasificador lineal.
+    # Es un solo producto punto por fila en lugar de recorrer 100 árboles completos.
+    compact_model = make_pipeline(
+        HashingVectorizer(n_features=2**16, alternate_sign=False, ngram_range=(1, 2)),
+        TfidfTransformer(),
+        LinearSVC(random_state=42)
+    )
+    compact_model.fit(X_train, y_train)
+    compact_accuracy = compact_model.score(X_test, y_test)
+
+    print(f"📊 Comparación sobre {len(X_test)} movimientos de prueba")
+    for nombre, modelo, precision in (("completo", model, accuracy), ("compacto", compact_model, compact_accuracy)):
+        p50, p99, lote = medir_latencia(modelo, X_test)
+        print(f"   {nombre:<9} precisión {precision * 100:.2f}% | una fila p50 {p50:.2f} ms, p99 {p99:.2f} ms | lote {lote:.1f} ms")
+
+    guardar_modelo(compact_model, 'modelo_movimientos_compacto.pkl')
+    print("✅ Modelo compacto guardado como 'modelo_movimientos_compacto.pkl'")
+
+
+def bloques_csv(archivos, chunk_size, desde_id=0):
+    # Con desde_id solo se entregan las filas con id mayor, igual que al leer de MySQL
+    for archivo in archivos:
+        invalidas = 0
+        for data in pd.read_csv(archivo, chunksize=chunk_size, encoding="utf-8-sig"):
+            if 'id' in data.columns:
+                # Una descripción partida en varias líneas deja texto en la columna id: esas filas se descartan
+                ids = pd.to_numeric(data['id'], errors="coerce")
+                invalidas += int(ids.isna().sum())
+                data = data[ids.notna()].assign(id=ids.dropna().astype("int64"))
+            if desde_id:
+                data = data[data['id'] > desde_id]
+            yield data
+        if invalidas:
+            print(f"⚠️ {invalidas} filas de {archivo} sin id numérico descartadas")
+
+
+def bloques_mysql(desde_id, chunk_size):
+    import mysql.connector
+    from db import DB_CONFIG
+    from descargainfo import paginar_movimientos
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        yield from paginar_movimientos(conn, desde_id, chunk_size)
+    finally:
+        conn.close()
+
+
+def _bloques(args, desde_id=0):
+    if args.mysql:
+        return bloques_mysql(desde_id, args.chunk_size)
+    return bloques_csv(args.csv, args.chunk_size, desde_id)
+
+
+def _etiquetas(args, desde_id=0):
+    # Una pasada leyendo solo las etiquetas de los movimientos a entrenar
+    etiquetas = set()
+    for data in _bloques(args, desde_id):
+        etiquetas.update(data['etiqueta'].dropna().astype(str).unique())
+    return etiquetas
+
+
+def _es_prueba(data):
+    # Partición estable por contenido: la misma fila cae siempre del mismo lado, en cualquier bloque y ejecución
+    return (pd.util.hash_pandas_object(data[['descripcion', 'monto']], index=False) % 5 == 0).to_numpy()
+
+
+def _vectorizar(vectorizer, textos, n_jobs):
+    # HashingVectorizer no guarda estado, así que cada parte del bloque se transforma en paralelo
+    procesos = n_jobs if n_jobs > 0 else os.cpu_count() or 1
+    if procesos == 1 or len(textos) < 2 * procesos:
+        return vectorizer.transform(textos)
+    partes = np.array_split(np.asarray(textos, dtype=object), procesos)
+    matrices = joblib.Parallel(n_jobs=procesos)(joblib.delayed(vectorizer.transform)(parte) for parte in partes)
+    return sp.vstack(matrices)
+
+
+def entrenar_incremental(args):
+    # Lee los movimientos por bloques (CSV o MySQL) y entrena con partial_fit, sin cargar todo en memoria
+    vectorizer = HashingVectorizer(n_features=2**18, alternate_sign=False, ngram_range=(1, 2))
+    anteriores = [entrada for entrada in leer_historial() if entrada["modo"] == "incremental"]
+
+    fuente = "mysql" if args.mysql else "csv"
+    desde_id = 0
+    if args.continuar and anteriores:
+        # Se retoma el último modelo y solo se leen los movimientos con id posterior a su marcador.
+        # Las versiones sin "fuente" son de antes de guardarla: su marcador de CSV siempre fue 0
+        anterior = anteriores[-1]
+        if anterior.get("fuente", fuente) != fuente:
+            raise SystemExit(f"❌ La versión {anterior['version']} se entrenó desde {anterior['fuente']}: "
+                             f"su marcador no aplica a {fuente}. Entrena sin --continuar")
+        desde_id = anterior.get("ultimo_id", 0)
+        if not args.mysql and desde_id and not all('id' in pd.read_csv(archivo, nrows=0, encoding="utf-8-sig").columns
+                                                   for archivo in args.csv):
+            raise SystemExit("❌ Para continuar desde CSV los archivos necesitan la columna id")
+        clasificador = joblib.load(anterior["artefacto"]).steps[-1][1]
+        clasificador.set_params(n_jobs=args.n_jobs)
+        clases = clasificador.classes_
+        # partial_fit no admite clases nuevas: descartarlas en silencio dejaría esos movimientos sin aprender
+        nuevas = _etiquetas(args, desde_id) - set(clases.astype(str))
+        if nuevas:
+            raise SystemExit(f"❌ Etiquetas que la versión {anterior['version']} no conoce: {', '.join(sorted(nuevas))}. "
+                             "Entrena sin --continuar para incluirlas")
+        print(f"♻️ Continuando desde la versión {anterior['version']} (movimientos con id > {desde_id})")
+    else:
+        clasificador = SGDClassifier(loss="modified_huber", random_state=42, n_jobs=args.n_jobs)
+        # partial_fit necesita todas las clases desde el primer bloque
+        clases = np.array(sorted(_etiquetas(args, desde_id)))
+
+    filas = 0
+    ultimo_id = desde_id
+    inicio = time.perf_counter()
+    for data in _bloques(args, desde_id):
+        data = data[data['etiqueta'].isin(clases)]
+        entrenamiento = data[~_es_prueba(data)]
+        if not entrenamiento.empty:
+            X = _vectorizar(vectorizer, preparar_texto(entrenamiento), args.n_jobs)
+            clasificador.partial_fit(X, entrenamiento['etiqueta'].astype(str), classes=clases)
+        filas += len(data)
+        if 'id' in data.columns and not data.empty:
+            # Los CSV no necesariamente vienen ordenados por id
+            ultimo_id = max(ultimo_id, int(data['id'].max()))
+        print(f"📦 {filas} movimientos procesados")
+    segundos = time.perf_counter() - inicio
+
+    if filas == 0:
+        print("✅ No hay movimientos nuevos para entrenar")
+        return
+
+    # Segunda pasada sobre la partición de prueba para medir la precisión
+    aciertos = total = 0
+    for data in _bloques(args, desde_id):
+        data = data[data['etiqueta'].isin(clases)]
+        prueba = data[_es_prueba(data)]
+        if prueba.empty:
+            continue
+        predicciones = clasificador.predict(_vectorizar(vectorizer, preparar_texto(prueba), args.n_jobs))
+        aciertos += int((predicciones == prueba['etiqueta'].astype(str).to_numpy()).sum())
+        total += len(prueba)
+    accuracy = aciertos / total if total else 0.0
+    mostrar_precision(accuracy, precision_anterior("incremental"))
+
+    clasificador.set_params(n_jobs=None)
+    model = make_pipeline(vectorizer, clasificador)
+    artefacto = guardar_version(model, "incremental", accuracy, segundos, filas, ultimo_id=ultimo_id, fuente=fuente,
+                               continua=bool(args.continuar))
+    if args.publicar:
+        guardar_modelo(model, MODELO_INCREMENTAL)
+        print(f"✅ {artefacto} publicado como '{MODELO_INCREMENTAL}' (MODELO=incremental)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena el clasificador de movimientos")
+    parser.add_argument("--modo", choices=["completo", "incremental"], default="completo",
+                        help="completo: TF-IDF + Random Forest en memoria; incremental: hashing + partial_fit por bloques")
+    parser.add_argument("--csv", nargs="+", default=csv_files, help="Archivos CSV de entrenamiento (admite comodines)")
+    parser.add_argument("--mysql", action="store_true", help="Modo incremental: leer los movimientos directamente de MySQL")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Procesos para entrenar/vectorizar (-1 = todos los núcleos)")
+    parser.add_argument("--continuar", action="store_true", help="Modo incremental: seguir entrenando la última versión")
+    parser.add_argument("--publicar", action="store_true", help=f"Modo incremental: copiar la versión nueva a {MODELO_INCREMENTAL}")
+    args = parser.parse_args()
+    args.csv = [archivo for patron in args.csv for archivo in sorted(glob.glob(patron))]
+
+    if args.modo == "completo":
+        entrenar_completo(args)
+    else:
+        entrenar_incremental(args)
+
+
+if __name__ == "__main__":
+    main()
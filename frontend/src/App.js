@@ -15,6 +15,8 @@ function App() {
   const [fileType, setFileType] = useState("excel");
   const [showDownloadOptions, setShowDownloadOptions] = useState(false)
   const [fileGeneratedMessage, setFileGeneratedMessage] = useState("")
+  const [jobId, setJobId] = useState("")
+  const [progress, setProgress] = useState("")
 
   const handleUpload = async () => {
     if (files.length === 0) return;
@@ -28,7 +30,7 @@ function App() {
     files.forEach(file => formData.append("files", file));
 
     try {
-      const response = await fetch(`${backendURL}/upload`, {
+      const response = await fetch(`${backendURL}/upload?async=1`, {
         method: "POST",
         body: formData,
       });
@@ -36,22 +38,43 @@ function App() {
       const data = await response.json();
       console.log("Respuesta del servidor", data)
 
-     if (data.processed) {
-      setUploadSuccess(true)
-      setShowDownloadOptions(true);
-     }
+      if (data.job_id) {
+        const job = await waitForJob(data.job_id)
+        if (job.processed) {
+          setJobId(data.job_id)
+          setUploadSuccess(true)
+          setShowDownloadOptions(true);
+        }
+      }
     } catch (error) {
       console.error("Error en la subida:", error);
     }
+    setProgress("");
     setIsProcessing(false);
   };
 
+  const waitForJob = async (id) => {
+    // El backend procesa en segundo plano; se consulta el avance hasta que termine
+    while (true) {
+      const response = await fetch(`${backendURL}/jobs/${id}`)
+      const job = await response.json()
+      if (job.total) {
+        setProgress(`${job.procesados} de ${job.total} archivos`)
+      }
+      if (job.estado === "terminado" || job.estado === "error" || !response.ok) {
+        console.log("Trabajo finalizado", job)
+        return job
+      }
+      await new Promise(resolve => setTimeout(resolve, 1500))
+    }
+  };
+
   const handleGenerateFile = async () => {
     try {
       console.log("Generando archivo en formato:", fileType)
       setFileGeneratedMessage("");
 
-      const response = await fetch(`${backendURL}/generate?file_type=${fileType}`)
+      const response = await fetch(`${backendURL}/generate?file_type=${fileType}&job_id=${jobId}`)
       const data = await response.json()
       console.log("Archivo generado:", data)
 
@@ -149,7 +172,7 @@ function App() {
             disabled={isProcessing}
             whileTap={{ scale: 0.95 }}
           >
-            {isProcessing ? "⌛ Procesando..." : "🚀 Subir Archivos"}
+            {isProcessing ? `⌛ Procesando... ${progress}` : "🚀 Subir Archivos"}
           </motion.button>
         )}
 